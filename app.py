@@ -1,25 +1,118 @@
-from flask import Flask, render_template, jsonify, request
-from syslog_analyzer import SyslogAnalyzer
-from lstm_model import LogLSTMModel
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
+from syslog_analyzer import SyslogAnalyzer, STATS_FILE
+from lstm_model import LogLSTMModel, PredictionCache, MODEL_FILE
+from stats_cache import StatsCache, make_json_body
+from live_ingest import LiveIngestServer, merge_live_delta
+from training_events import TrainingEventLog, sse_stream, sse_poll_redirect
+from training_jobs import TrainingJobManager
+from forecast_index import ForecastIndex, FORECAST_INDEX_FILE, risk_row, timeline_entry
+from time_index import TimeBucketIndex, bucket_edges, BUCKET_UNITS, ALL_TYPES, OTHER_TYPE
+from shards import ShardSet, SHARD_DIR
+import metrics
+from datetime import datetime, timedelta
 import threading
+import multiprocessing
+import time
 import os
 import json
 
 app = Flask(__name__)
 
-# Global instances
-analyzer = SyslogAnalyzer()
-lstm = LogLSTMModel()
+# Global instances, created on first use so a cold start only pays for what it serves
+analyzer = None
+analyzer_lock = threading.Lock()
+lstm = None
+lstm_lock = threading.Lock()
+lstm_checkpoint_checked = False
+prediction_cache = PredictionCache(max_entries=50000)
 
-# Training status globally for simple polling
-training_progress = {
-    'status': 'idle', # idle, running, completed, error
-    'logs': [],
-    'progress': 0
-}
+MAX_PREDICT_LINES = 10000
+MAX_PREDICT_WORDS = 50
 
-# Cache analysis result
-# analysis_cache = {} -> Disabled to force reload for demo
+def get_analyzer():
+    global analyzer
+    if analyzer is None:
+        with analyzer_lock:
+            if analyzer is None:
+                analyzer = SyslogAnalyzer()
+    return analyzer
+
+def get_lstm():
+    # Warm start: the last checkpoint is memory-mapped on first use instead of retraining
+    global lstm, lstm_checkpoint_checked
+    with lstm_lock:
+        if lstm is None:
+            lstm = LogLSTMModel()
+        if not lstm_checkpoint_checked:
+            lstm_checkpoint_checked = True
+            if not lstm.is_trained() and os.path.exists(MODEL_FILE):
+                try:
+                    lstm.load(MODEL_FILE)
+                except Exception as e:
+                    print(f"Failed to load model checkpoint: {e}")
+    return lstm
+
+# Training status/log events for /api/train/status and the /api/train/stream SSE feed
+training_log = TrainingEventLog()
+
+def release_lstm_checkpoint():
+    # The training process replaces MODEL_FILE; a live memory map would block that on Windows
+    with lstm_lock:
+        if lstm is not None:
+            lstm.detach()
+
+def reload_lstm(params):
+    # Load the new checkpoint into a fresh model and swap it in, so in-flight predictions keep a consistent model
+    global lstm, lstm_checkpoint_checked
+    model = LogLSTMModel().load(params['model_file'])
+    with lstm_lock:
+        model.version = (lstm.version if lstm is not None else 0) + 1
+        lstm = model
+        lstm_checkpoint_checked = True
+
+# Training runs in its own process, one job at a time
+training_jobs = TrainingJobManager(training_log, on_complete=reload_lstm, before_start=release_lstm_checkpoint)
+
+# Shared stats.json cache, reloaded when the file changes on disk
+stats_cache = StatsCache(STATS_FILE)
+# Per-type event times/statistics written by rebuild_stats.py; same reload rules
+forecast_index_cache = StatsCache(FORECAST_INDEX_FILE, loader=ForecastIndex.load)
+# Per-source stats shards (shards.py); reloaded when a shard is renamed into the directory
+shard_cache = StatsCache(SHARD_DIR, loader=ShardSet.load)
+
+# Optional live syslog listener (UDP+TCP) running next to the web server
+live_ingest = None
+# (not in spawned training workers, which re-import this module)
+if os.environ.get("LIVE_SYSLOG_PORT") and multiprocessing.parent_process() is None:
+    live_port = int(os.environ["LIVE_SYSLOG_PORT"])
+    live_ingest = LiveIngestServer(udp_port=live_port, tcp_port=live_port)
+    live_ingest.start_in_thread()
+live_analyze_cache = {}
+
+# Per-route latency; the route pattern (not the raw path) keeps the label set bounded
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "Request latency per route", ("route", "method"))
+REQUESTS = metrics.counter("http_requests_total", "Requests per route and status", ("route", "method", "status"))
+
+if metrics.METRICS_ENABLED:
+    @app.before_request
+    def start_request_timer():
+        request.environ['metrics.start'] = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = request.environ.get('metrics.start')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - start, (route, request.method))
+            REQUESTS.inc(1, (route, request.method, response.status_code))
+        return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape target
+    if not metrics.METRICS_ENABLED:
+        return jsonify({'status': 'error', 'message': 'Metrics are disabled (METRICS=0).'}), 404
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/')
 def index():
@@ -34,25 +127,24 @@ def predict_page():
     return render_template('predict.html')
 
 # API Endpoints
-@app.route('/api/analyze')
-def api_analyze():
-    # Force reload logic
-    print("API Analyze called. Reloading stats.json...")
-    
-    # Check if stats.json exists
-    import os, json
-    stats_path = "stats.json" # Relative path for deployment
-    
+def cached_json_response(body, etag):
+    # Pre-serialized body with ETag; dashboards polling an unchanged file get a bodyless 304
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def build_analyze_payload(stats_data):
     chart_labels = []
     monthly_totals = []
     monthly_ratios = []
     top_5 = []
     top_5_counts = []
     
-    if os.path.exists(stats_path):
-        with open(stats_path, 'r', encoding='utf-8') as f:
-            stats_data = json.load(f)
-            
+    if stats_data is not None:
         # Parse Monthly Data (12 Months)
         for m_data in stats_data.get('monthly', []):
             chart_labels.append(f"{m_data['month']}월")
@@ -61,11 +153,10 @@ def api_analyze():
             
         top_5 = stats_data.get('top_5_global', [])
         top_5_counts = stats_data.get('top_5_counts', []) # Restored for Pie Chart
-            
     else:
         print("stats.json not found!")
     
-    return jsonify({
+    return {
         'status': 'success',
         'data': {
             'chart_labels': chart_labels,
@@ -74,152 +165,381 @@ def api_analyze():
             'top_5': top_5,
             'top_5_counts': top_5_counts,
         }
-    })
+    }
+
+def build_live_analyze_body(snapshot):
+    # stats.json plus live errors received after it was generated, rebuilt once per live flush
+    aggregator = live_ingest.aggregator
+    key = (snapshot.signature, aggregator.generation)
+    entry = live_analyze_cache.get('entry')
+    if entry is None or entry[0] != key:
+        stats_data = snapshot.data
+        if stats_data is None:
+            stats_data = aggregator.snapshot()
+        else:
+            since = datetime.fromisoformat(stats_data['generated_at']) if 'generated_at' in stats_data else None
+            partials = aggregator.month_partials(since)
+            stats_data = merge_live_delta(stats_data, partials)
+        entry = (key,) + make_json_body(build_analyze_payload(stats_data))
+        live_analyze_cache['entry'] = entry
+    return entry[1], entry[2]
+
+ANALYZE_SOURCE_CACHE_SIZE = 64
+
+def analyze_sources(sources):
+    # Drill-down: the shards of the requested sources merged on the fly (live data has no source, so none is added)
+    snapshot = shard_cache.snapshot()
+    shard_set = snapshot.data
+    if shard_set is None or not shard_set.shards:
+        return jsonify({'status': 'error', 'message': f'No stats shards found in {SHARD_DIR} (run shards.py build).'}), 404
+    unknown = shard_set.unknown(sources)
+    if unknown:
+        return jsonify({'status': 'error', 'message': f'Unknown source(s): {", ".join(unknown)}'}), 404
+
+    key = tuple(sorted(set(sources)))
+    bodies = snapshot.derived('analyze_sources', lambda data: {})
+    entry = bodies.get(key)
+    if entry is None:
+        payload = build_analyze_payload(shard_set.stats(key))
+        payload['data']['sources'] = list(key)
+        entry = make_json_body(payload)
+        if len(bodies) >= ANALYZE_SOURCE_CACHE_SIZE:
+            bodies.clear()
+        bodies[key] = entry
+    return cached_json_response(*entry)
+
+@app.route('/api/analyze')
+def api_analyze():
+    # Query: ?source=A&source=B limits the view to those shards (default: stats.json)
+    sources = request.args.getlist('source')
+    if sources:
+        return analyze_sources(sources)
+    # stats.json is parsed and serialized once per file version, not per request
+    snapshot = stats_cache.snapshot()
+    if live_ingest is not None:
+        body, etag = build_live_analyze_body(snapshot)
+    else:
+        body, etag = snapshot.json_body('analyze', build_analyze_payload)
+    return cached_json_response(body, etag)
+
+@app.route('/api/sources')
+def api_sources():
+    # Sources with a shard, for the ?source= drill-down
+    shard_set = shard_cache.snapshot().data
+    return jsonify({'status': 'success', 'data': shard_set.sources() if shard_set is not None else []})
+
+QUERY_MAX_TYPES = 50
+QUERY_TOP_TYPES = 10
+
+def get_time_index():
+    # Hourly prefix-sum index over the forecast index events, built once per index file version
+    snapshot = forecast_index_cache.snapshot()
+    if snapshot.data is not None:
+        return snapshot.derived('time_index', TimeBucketIndex.from_forecast_index)
+    return get_analyzer().time_index
+
+def parse_query_time(value):
+    # "2025-05-01", "2025-05-01T10:00" or "2025-05-01 10:00:00" -> hours since epoch
+    # Log times are naive wall-clock times, so an explicit UTC offset has no meaning here
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        raise ValueError("timezone offsets are not supported")
+    return int((dt - datetime(1970, 1, 1)).total_seconds() // 3600)
+
+@app.route('/api/query', methods=['GET'])
+def api_query():
+    # Query: ?from=2025-05-01&to=2025-06-01&type=A&type=B&bucket=hour|day|month|none
+    # from is inclusive, to exclusive; both are rounded down to the hour
+    index = get_time_index()
+    if index is None:
+        return jsonify({'status': 'error', 'message': 'Query index not found (run rebuild_stats.py).'})
+
+    start_hour, end_hour = index.hour_range()
+    try:
+        h0 = parse_query_time(request.args['from']) if request.args.get('from') else start_hour
+        h1 = parse_query_time(request.args['to']) if request.args.get('to') else end_hour
+    except (ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': 'from/to must be ISO dates without a timezone, '
+                                                      'e.g. 2025-05-01 or 2025-05-01T10:00.'}), 400
+    if h1 <= h0:
+        return jsonify({'status': 'error', 'message': '"to" must be after "from".'}), 400
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKET_UNITS and bucket != 'none':
+        return jsonify({'status': 'error', 'message': 'bucket must be hour, day, month or none.'}), 400
+
+    names = list(dict.fromkeys(request.args.getlist('type'))) or [ALL_TYPES]
+    if len(names) > QUERY_MAX_TYPES:
+        return jsonify({'status': 'error', 'message': f'At most {QUERY_MAX_TYPES} types per query.'}), 400
+    unknown = [t for t in names if t not in index.rows and t not in index.folded]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f'Unknown type(s): {", ".join(unknown)}'}), 404
+    # Rare types beyond the index's row cap are only counted together, in the "(other)" row
+    folded = [t for t in names if t not in index.rows]
+    if folded:
+        names = list(dict.fromkeys(OTHER_TYPE if t in folded else t for t in names))
+
+    try:
+        edges, labels = bucket_edges(h0, h1, bucket)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    rows = [index.rows[t] for t in names]
+    counts = index.series(rows, edges)
+
+    return jsonify({'status': 'success', 'data': {
+        'from': str(datetime(1970, 1, 1) + timedelta(hours=h0)),
+        'to': str(datetime(1970, 1, 1) + timedelta(hours=h1)),
+        'bucket': bucket,
+        'buckets': labels,
+        'series': {t: c.tolist() for t, c in zip(names, counts)},
+        'totals': {t: int(c.sum()) for t, c in zip(names, counts)},
+        'top_types': index.top(h0, h1, QUERY_TOP_TYPES),
+        'folded': {t: OTHER_TYPE for t in folded},
+    }})
 
 @app.route('/api/train', methods=['POST'])
 def api_train():
-    global training_progress
-    
     # Check if analysis is done, if not, try loading from disk
+    analyzer = get_analyzer()
     if not analyzer.top_5_types:
         analyzer.load_stats_from_json()
         
     if not analyzer.top_5_types:
         return jsonify({'status': 'error', 'message': 'Please visit Dashboard to analyze data first (stats.json missing).'})
     
-    # Run in background thread to not block response
-    def run_training():
-        global training_progress
-        training_progress['status'] = 'running'
-        training_progress['logs'] = ["Initializing...", "Loading Data (Months: 05 - 11)..."]
-        
-        # Optimized: Load the 5-11 month data from the analyzer
-        training_months = [f"{m:02d}" for m in range(5, 12)]
-        training_texts = analyzer.get_training_data(target_months=training_months)
-        
-        if not training_texts:
-            training_progress['status'] = 'error'
-            training_progress['logs'].append("Error: No training data found for May-Nov.")
-            return
+    params = {
+        'root_dir': analyzer.root_dir,
+        'event_store_dir': analyzer.event_store.store_dir,
+        'months': [f"{m:02d}" for m in range(5, 12)], # Train on the 5-11 month data
+        'epochs': 2,
+        'model_file': MODEL_FILE,
+        # {"templates": true} trains on mined message templates (much smaller vocabulary)
+        'templates': bool((request.get_json(silent=True) or {}).get('templates', False)),
+    }
+    state, job_id = training_jobs.submit(params)
+    if state == 'rejected':
+        return jsonify({'status': 'error', 'message': 'Training is already running and another run is queued.'}), 409
+    if state == 'queued':
+        return jsonify({'status': 'success', 'job_id': job_id, 'message': 'Training is already running. Request queued.'})
+    return jsonify({'status': 'success', 'job_id': job_id, 'message': 'Training started. Data loading in background.'})
 
-        training_progress['logs'].append(f"Data Loaded. {len(training_texts)} samples from May-Nov range.")
-        training_progress['progress'] = 0
-        
-        # Simulated Epochs for the demo UI
-        epochs = 2
-        for epoch in range(epochs):
-            msg = f"Epoch {epoch+1}/{epochs} started..."
-            print(msg)
-            training_progress['logs'].append(msg)
-            training_progress['progress'] = int(((epoch) / epochs) * 100)
-            
-            # Use actual training logic
-            lstm.train(training_texts, epochs=1) # Train 1 epoch at a time
-            
-            msg = f"Epoch {epoch+1}/{epochs} completed."
-            training_progress['logs'].append(msg)
-            training_progress['progress'] = int(((epoch+1) / epochs) * 100)
-            
-        training_progress['status'] = 'completed'
-        training_progress['logs'].append("Training Finished Successfully.")
-        training_progress['progress'] = 100
-        
-    if training_progress['status'] == 'running':
-         return jsonify({'status': 'success', 'message': 'Training is already running.'})
-
-    thread = threading.Thread(target=run_training)
-    thread.start()
-    
-    return jsonify({'status': 'success', 'message': 'Training started. Data loading in background.'})
+@app.route('/api/train/cancel', methods=['POST'])
+def api_train_cancel():
+    cancelled = training_jobs.cancel()
+    if not cancelled:
+        return jsonify({'status': 'error', 'message': 'No training is running.'})
+    return jsonify({'status': 'success', 'message': f'Cancelling {cancelled} training job(s).'})
 
 @app.route('/api/train/status')
 def api_train_status():
-    return jsonify(training_progress)
+    # ?since=<seq>: only the events after seq (the polling fallback of /api/train/stream)
+    if 'since' in request.args:
+        try:
+            since = int(request.args['since'])
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'since must be an integer.'}), 400
+        return jsonify(training_log.poll(since))
+    return jsonify(training_log.snapshot())
 
+# Every open stream holds a waitress thread, so only a few run at once; the rest are told to poll
+MAX_TRAIN_STREAMS = int(os.environ.get('MAX_TRAIN_STREAMS', 4))
+train_stream_slots = threading.BoundedSemaphore(MAX_TRAIN_STREAMS)
 
+def limited_train_stream(last_seq):
+    # The slot is taken once the response is being sent and released when the stream
+    # ends or the client disconnects (generator closed)
+    if not train_stream_slots.acquire(blocking=False):
+        yield from sse_poll_redirect(last_seq)
+        return
+    try:
+        yield from sse_stream(training_log, last_seq)
+    finally:
+        train_stream_slots.release()
 
-@app.route('/api/forecast', methods=['GET'])
-def api_forecast():
-    import json
-    import os
-    from datetime import datetime, timedelta
-    
-    stats_path = "stats.json" # Relative path for deployment
-    if not os.path.exists(stats_path):
-        return jsonify({'status': 'error', 'message': 'Stats not found'})
-        
-    with open(stats_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
+@app.route('/api/train/stream')
+def api_train_stream():
+    # SSE feed of incremental training events; resumes from Last-Event-ID on reconnect
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        last_seq = 0
+    response = Response(stream_with_context(limited_train_stream(last_seq)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/predict', methods=['POST'])
+def api_predict():
+    # Body: {"lines": [...], "next_words": 10, "mode": "greedy"|"topk", "k": 5}
+    body = request.get_json(silent=True) or {}
+    lines = body.get('lines')
+    if lines is None and 'seed' in body:
+        lines = [body['seed']]
+    if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+        return jsonify({'status': 'error', 'message': '"lines" must be a list of strings.'}), 400
+    if len(lines) > MAX_PREDICT_LINES:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_PREDICT_LINES} lines per request.'}), 400
+
+    mode = body.get('mode', 'greedy')
+    if mode not in ('greedy', 'topk'):
+        return jsonify({'status': 'error', 'message': 'mode must be "greedy" or "topk".'}), 400
+    try:
+        next_words = max(0, min(int(body.get('next_words', 10)), MAX_PREDICT_WORDS))
+        k = max(1, int(body.get('k', 5)))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'next_words and k must be integers.'}), 400
+
+    model = get_lstm()
+    if not model.is_trained():
+        return jsonify({'status': 'error', 'message': 'Model not trained.'})
+
+    version = model.version
+    if mode == 'topk':
+        # Sampled output is not cacheable
+        predictions = model.predict_batch(lines, next_words=next_words, mode='topk', k=k)
+    else:
+        predictions = [prediction_cache.get((version, line, next_words)) for line in lines]
+        missing = [i for i, p in enumerate(predictions) if p is None]
+        if missing:
+            # Only cache misses go through the model, as one batch
+            fresh = model.predict_batch([lines[i] for i in missing], next_words=next_words)
+            for i, text in zip(missing, fresh):
+                predictions[i] = text
+                prediction_cache.put((version, lines[i], next_words), text)
+
+    return jsonify({'status': 'success', 'data': {'model_version': version, 'predictions': predictions}})
+
+
+
+# Logic: Forecast Timeline Generation (7-Month focused: 5-11)
+# Total Time Window = 214 days * 24 = 5136 hours
+# (May:31, Jun:30, Jul:31, Aug:31, Sep:30, Oct:31, Nov:30 = 214 days)
+FORECAST_TOTAL_HOURS = 214 * 24
+FORECAST_HORIZON_DAYS = 30 # Look ahead 1 month
+FORECAST_MAX_EVENTS_PER_TYPE = 10 # More events for the timeline
+
+def build_forecast_params(stats_data):
+    # Per-type MTBF/risk rows; only depend on stats.json, so built once per file version
     # NEW LOGIC: Use pre-calculated global top types for May-Nov
-    top_types_list = data.get('top_types_summary', [])
+    top_types_list = stats_data.get('top_types_summary', [])
     target_types = top_types_list[:15]
     
-    forecast_results = []
-    
-    # Logic: Forecast Timeline Generation (7-Month focused: 5-11)
-    # Total Time Window = 214 days * 24 = 5136 hours
-    # (May:31, Jun:30, Jul:31, Aug:31, Sep:30, Oct:31, Nov:30 = 214 days)    
-    total_hours = 214 * 24 
-    
+    return [risk_row(error_type, count, count / FORECAST_TOTAL_HOURS)
+            for error_type, count in target_types if count > 0]
+
+FORECAST_MAX_TYPES = 100
+FORECAST_MAX_HORIZON_DAYS = 366
+FORECAST_BODY_CACHE_SIZE = 256
+EPOCH = datetime(1970, 1, 1)
+
+@app.route('/api/forecast', methods=['GET'])
+def api_forecast():
+    # Query: ?type=A&type=B (default: top 15), horizon_days=30, max_events=10
+    snapshot = forecast_index_cache.snapshot()
+    index = snapshot.data
+    if index is None:
+        return legacy_forecast()
+
+    try:
+        horizon_days = float(request.args.get('horizon_days', FORECAST_HORIZON_DAYS))
+        max_events = int(request.args.get('max_events', FORECAST_MAX_EVENTS_PER_TYPE))
+        top = int(request.args.get('top', 15))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'horizon_days, max_events and top must be numbers.'}), 400
+    if not 0 < horizon_days <= FORECAST_MAX_HORIZON_DAYS:
+        return jsonify({'status': 'error', 'message': f'horizon_days must be in (0, {FORECAST_MAX_HORIZON_DAYS}].'}), 400
+    max_events = max(1, min(max_events, 100))
+
+    names = request.args.getlist('type')
+    if names:
+        unknown = [t for t in names if t not in index.type_ids]
+        if unknown:
+            return jsonify({'status': 'error', 'message': f'Unknown type(s): {", ".join(unknown)}'}), 404
+        type_ids = [index.type_ids[t] for t in dict.fromkeys(names)][:FORECAST_MAX_TYPES]
+    else:
+        type_ids = index.top_types(max(1, min(top, FORECAST_MAX_TYPES)))
+
     # Consistency Fix: Use "Start of Today" as an anchor so times don't drift on every click
     current_time = datetime.now()
     anchor_time = datetime(current_time.year, current_time.month, current_time.day)
+    occurrences = index.occurrences(type_ids, int((anchor_time - EPOCH).total_seconds()),
+                                    (current_time - EPOCH).total_seconds(), horizon_days * 24, max_events)
+
+    # The timeline only changes when an occurrence enters or leaves the window,
+    # so the serialized body is reused until then
+    key = (anchor_time, tuple((k, tuple(ns)) for k, ns, _ in occurrences))
+    bodies = snapshot.derived('forecast_bodies', lambda data: {})
+    entry = bodies.get(key)
+    if entry is None:
+        forecast_timeline = []
+        for k, ns, times in occurrences:
+            p = index.params(k)
+            for n, t in zip(ns, times):
+                forecast_timeline.append(timeline_entry(p, EPOCH + timedelta(seconds=round(t)), n))
+
+        # Sort prediction by timestamp (Chronological Order)
+        forecast_timeline.sort(key=lambda x: x['timestamp_iso'])
+        entry = make_json_body({'status': 'success', 'data': forecast_timeline})
+        if len(bodies) >= FORECAST_BODY_CACHE_SIZE:
+            bodies.clear()
+        bodies[key] = entry
+
+    return cached_json_response(*entry)
+
+@app.route('/api/forecast/profile', methods=['GET'])
+def api_forecast_profile():
+    # Inter-arrival histogram, seasonality and windowed rates of one type
+    index = forecast_index_cache.snapshot().data
+    if index is None:
+        return jsonify({'status': 'error', 'message': 'Forecast index not found'})
+    k = index.type_ids.get(request.args.get('type', ''))
+    if k is None:
+        return jsonify({'status': 'error', 'message': 'Unknown type'}), 404
+    return jsonify({'status': 'success', 'data': index.profile(k)})
+
+def legacy_forecast():
+    # Fallback without a forecast index: MTBF from the global totals in stats.json
+    snapshot = stats_cache.snapshot()
+    if snapshot.data is None:
+        return jsonify({'status': 'error', 'message': 'Stats not found'})
+    params = snapshot.derived('forecast_params', build_forecast_params)
     
-    forecast_timeline = []
-    
-    horizon_days = 30 # Look ahead 1 month
-    max_events_per_type = 10 # More events for the timeline
+    # Consistency Fix: Use "Start of Today" as an anchor so times don't drift on every click
+    current_time = datetime.now()
+    anchor_time = datetime(current_time.year, current_time.month, current_time.day)
+    horizon_end = current_time + timedelta(days=FORECAST_HORIZON_DAYS)
+    elapsed_since_anchor = (current_time - anchor_time).total_seconds() / 3600
     
-    for error_type, count in target_types:
-        if count <= 0: continue
-        
-        mtbf_hours = total_hours / count
-        
-        # Risk Level Logic
-        if mtbf_hours < 24:
-            risk = "CRITICAL (Daily)"
-            risk_color = "text-danger"
-        elif mtbf_hours < 168: # 7 days
-            risk = "HIGH (Weekly)"
-            risk_color = "text-warning"
-        else:
-            risk = "MEDIUM (Monthly+)"
-            risk_color = "text-success"
-            
-        import math
-        prob_24h_val = 1 - math.exp(-24 / mtbf_hours) if mtbf_hours > 0 else 0
-        prob_text = f"{prob_24h_val * 100:.1f}%"
-
-        # Generate occurrences cycling from the anchor
-        # Find the first occurrence AFTER current_time
-        # (Start + MTBF * N) > Now
-        elapsed_since_anchor = (current_time - anchor_time).total_seconds() / 3600
+    # Generate occurrences cycling from the anchor
+    # Find the first occurrence AFTER current_time
+    # (Start + MTBF * N) > Now
+    occurrences = []
+    for p in params:
+        mtbf_hours = p['mtbf_hours']
         n_start = int(elapsed_since_anchor / mtbf_hours) + 1
-        
-        for n in range(n_start, n_start + max_events_per_type):
-            event_time = anchor_time + timedelta(hours=n * mtbf_hours)
-            
-            # Stop if beyond horizon
-            if event_time > current_time + timedelta(days=horizon_days):
-                break
-            
-            forecast_timeline.append({
-                'timestamp_iso': event_time.isoformat(), # Raw format for JS countdown
-                'type': error_type,
-                'count': count,
-                'mtbf': f"{mtbf_hours:.1f}h",
-                'next_est': event_time.strftime('%Y-%m-%d %H:%M'),
-                'risk': risk,
-                'risk_color': risk_color,
-                'prob_24h': prob_text,
-                'occurrence_index': n # Absolute sequence number
-            })
-            
-    # Sort prediction by timestamp (Chronological Order)
-    forecast_timeline.sort(key=lambda x: x['timestamp_iso'])
+        n_end = n_start
+        while n_end < n_start + FORECAST_MAX_EVENTS_PER_TYPE and \
+                anchor_time + timedelta(hours=n_end * mtbf_hours) <= horizon_end: # Stop if beyond horizon
+            n_end += 1
+        occurrences.append((n_start, n_end))
+    
+    # The timeline only changes when an occurrence enters or leaves the window,
+    # so the serialized body is reused until then
+    key = (anchor_time, tuple(occurrences))
+    cached = snapshot.derived('forecast_body', lambda data: {})
+    entry = cached.get('entry')
+    if entry is None or entry[0] != key:
+        forecast_timeline = []
+        for p, (n_start, n_end) in zip(params, occurrences):
+            for n in range(n_start, n_end):
+                forecast_timeline.append(timeline_entry(p, anchor_time + timedelta(hours=n * p['mtbf_hours']), n))
+                
+        # Sort prediction by timestamp (Chronological Order)
+        forecast_timeline.sort(key=lambda x: x['timestamp_iso'])
+        body, etag = make_json_body({'status': 'success', 'data': forecast_timeline})
+        entry = (key, body, etag)
+        cached['entry'] = entry
     
-    return jsonify({'status': 'success', 'data': forecast_timeline})
+    return cached_json_response(entry[1], entry[2])
 
 if __name__ == '__main__':
     # Use Waitress for Production Stability
@@ -230,5 +550,6 @@ if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     
     print(f"Starting Production Server on http://0.0.0.0:{port}")
-    serve(app, host='0.0.0.0', port=port, threads=6)
+    # Each open /api/train/stream holds a worker thread for up to 30s; at most MAX_TRAIN_STREAMS at once
+    serve(app, host='0.0.0.0', port=port, threads=int(os.environ.get('WAITRESS_THREADS', 12)))
 
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, run_isolated
+from benchmarks.synthetic import generate_tree
+
+ENDPOINTS = {
+    "analyze": "/api/analyze",
+    "forecast": "/api/forecast",
+    "forecast_type": "/api/forecast?type=syslog-ng&horizon_days=90",
+    "query": "/api/query?from=2025-01-01&to=2025-04-01&bucket=day",
+}
+
+
+def _bench_endpoints(stats_file, index_file, threads, requests_per_thread):
+    # Point the app at the synthetic stats before it is imported
+    os.environ["STATS_FILE"] = stats_file
+    os.environ["FORECAST_INDEX_FILE"] = index_file
+    os.environ.pop("LIVE_SYSLOG_PORT", None)
+    import app as app_module
+
+    flask_app = app_module.app
+    results = {}
+    for name, url in ENDPOINTS.items():
+        client = flask_app.test_client()
+        assert client.get(url).status_code == 200, url # warm caches, fail loudly on a broken endpoint
+
+        def worker(_):
+            local = flask_app.test_client()
+            latencies = []
+            for _ in range(requests_per_thread):
+                t0 = time.perf_counter()
+                local.get(url)
+                latencies.append(time.perf_counter() - t0)
+            return latencies
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            latencies = [lat for chunk in ex.map(worker, range(threads)) for lat in chunk]
+        elapsed = time.perf_counter() - t0
+        results[name] = {"url": url, "threads": threads, **latency_summary(latencies),
+                         "requests_per_sec": round(len(latencies) / elapsed)}
+    return results
+
+
+def run(threads=8, requests_per_thread=200, lines_per_file=50000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        from rebuild_stats import rebuild_stats
+
+        root = os.path.join(work_dir, "logs")
+        generate_tree(root, months=range(1, 13), days_per_month=2, lines_per_file=lines_per_file, error_rate=0.005)
+        stats_file = os.path.join(work_dir, "stats.json")
+        index_file = os.path.join(work_dir, "forecast_index.npz")
+        rebuild_stats(root, stats_file, forecast_index_file=index_file)
+        return run_isolated(_bench_endpoints, stats_file, index_file, threads, requests_per_thread)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p99 latency of the dashboard APIs under concurrent test-client load.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per thread")
+    args = parser.parse_args()
+    print(json.dumps(run(args.threads, args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import tempfile
+import argparse
+
+from benchmarks.synthetic import generate_tree
+from scan_engine import list_month_files, scan_file
+
+
+def legacy_scan_file(fpath):
+    # Per-line loop that rebuild_stats used before the block parser
+    type_counts = {}
+    with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            parts = line.split('\t')
+            if len(parts) > 8 and 'err' in parts[2].lower():
+                type_counts[parts[7]] = type_counts.get(parts[7], 0) + 1
+    return type_counts
+
+
+def _time(fn, files, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for fpath in files:
+            fn(fpath)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lines/sec of the legacy per-line loop vs the block parser.")
+    parser.add_argument("--lines", type=int, default=500000, help="lines per file")
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        total = generate_tree(root, months=(1,), days_per_month=args.files,
+                              lines_per_file=args.lines, error_rate=args.error_rate)
+        month_files, _ = list_month_files(root, ["01"])
+        files = month_files["01"]
+
+        before = _time(legacy_scan_file, files, args.repeat)
+        after = _time(scan_file, files, args.repeat)
+
+    print(f"lines: {total}")
+    print(f"before (per-line split): {total / before:,.0f} lines/sec")
+    print(f"after  (block parser):   {total / after:,.0f} lines/sec ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+import argparse
+
+from benchmarks.common import best_of, run_isolated, peak_rss_mb
+from benchmarks.synthetic import generate_tree
+
+
+def _bench_rebuild(root, work_dir, total_lines, workers, repeat):
+    from rebuild_stats import rebuild_stats
+
+    output = os.path.join(work_dir, "stats.json")
+    index = os.path.join(work_dir, "forecast_index.npz")
+    manifest = os.path.join(work_dir, "manifest.json")
+    full, _ = best_of(lambda: rebuild_stats(root, output, workers=workers, forecast_index_file=index), repeat)
+
+    if os.path.exists(manifest):
+        os.remove(manifest)
+    first, _ = best_of(lambda: rebuild_stats(root, output, workers=workers, incremental=True,
+                                             manifest_file=manifest, forecast_index_file=index), 1)
+    unchanged, _ = best_of(lambda: rebuild_stats(root, output, workers=workers, incremental=True,
+                                                 manifest_file=manifest, forecast_index_file=index), repeat)
+    return {
+        "workers": workers,
+        "full_seconds": round(full, 4),
+        "full_lines_per_sec": round(total_lines / full),
+        "incremental_first_seconds": round(first, 4),
+        "incremental_unchanged_seconds": round(unchanged, 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _bench_scan_file(root, total_lines, repeat):
+    from scan_engine import list_month_files, scan_file
+
+    month_files, _ = list_month_files(root)
+    files = [f for m_str in sorted(month_files) for f in month_files[m_str]]
+    elapsed, _ = best_of(lambda: [scan_file(f) for f in files], repeat)
+    return {"seconds": round(elapsed, 4), "lines_per_sec": round(total_lines / elapsed)}
+
+
+def _bench_analyzer(root, work_dir, months, total_lines, repeat):
+    # No stats.json / event store: exercises the raw-file fallback paths
+    os.environ["STATS_FILE"] = os.path.join(work_dir, "missing_stats.json")
+    from syslog_analyzer import SyslogAnalyzer
+
+    analyzer = SyslogAnalyzer(root, os.path.join(work_dir, "no_store"))
+    analyze, _ = best_of(analyzer.analyze_12_months, repeat)
+    training, texts = best_of(lambda: analyzer.get_training_data(target_months=months), repeat)
+    return {
+        "analyze_12_months_seconds": round(analyze, 4),
+        "get_training_data_seconds": round(training, 4),
+        "get_training_data_lines_per_sec": round(total_lines / training),
+        "training_messages": len(texts),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run(lines_per_file=200000, days_per_month=2, months=(1, 2, 3), error_rate=0.001, workers=None, repeat=3):
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as work_dir:
+        root = os.path.join(work_dir, "logs")
+        total = generate_tree(root, months=months, days_per_month=days_per_month,
+                              lines_per_file=lines_per_file, error_rate=error_rate)
+        month_strs = [f"{m:02d}" for m in months]
+        return {
+            "lines": total,
+            "scan_file": run_isolated(_bench_scan_file, root, total, repeat),
+            "rebuild_stats": run_isolated(_bench_rebuild, root, work_dir, total, workers, repeat),
+            "analyzer": run_isolated(_bench_analyzer, root, work_dir, month_strs, total, repeat),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lines/sec of rebuild_stats and SyslogAnalyzer scanning.")
+    parser.add_argument("--lines", type=int, default=200000, help="lines per file")
+    parser.add_argument("--days", type=int, default=2, help="files per month")
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    result = run(args.lines, args.days, tuple(range(1, args.months + 1)), workers=args.workers, repeat=args.repeat)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
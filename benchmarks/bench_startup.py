@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A cold web process must import and serve / and /api/analyze within these
+BUDGETS = {"import_seconds": 0.5, "cold_boot_seconds": 1.0}
+# Modules that must not be loaded by a cold boot (only the raw-file fallback and training need them)
+FORBIDDEN_AT_BOOT = ("pandas", "matplotlib")
+
+COLD_BOOT = """
+import sys, json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+status = [client.get('/').status_code, client.get('/api/analyze').status_code]
+t2 = time.perf_counter()
+from benchmarks.common import peak_rss_mb
+print(json.dumps({"import_seconds": t1 - t0, "cold_boot_seconds": t2 - t0, "status": status,
+                  "peak_rss_mb": peak_rss_mb(),
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FORBIDDEN_AT_BOOT,)
+
+
+def _env():
+    env = dict(os.environ)
+    env.pop("LIVE_SYSLOG_PORT", None)
+    env["PYTHONPATH"] = REPO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _depth(name):
+    return len(name) - len(name.lstrip())
+
+
+def import_profile(top=10):
+    """`python -X importtime -c "import app"`: total time and the slowest direct imports of app (cumulative)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=REPO_DIR, env=_env(),
+                          capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    # Children are listed right before their parent, one indentation level (2 spaces) deeper
+    app_at = next(i for i, m in enumerate(modules) if m[0].strip() == "app")
+    app_depth = _depth(modules[app_at][0])
+    direct = []
+    for m in reversed(modules[:app_at]):
+        if _depth(m[0]) <= app_depth:
+            break
+        if _depth(m[0]) == app_depth + 2:
+            direct.append(m)
+    slowest = sorted(direct, key=lambda m: m[2], reverse=True)[:top]
+    return {
+        "app_import_ms": round(modules[app_at][2] / 1000, 1),
+        "slowest_direct_imports_ms": {name.strip(): round(cum / 1000, 1) for name, _, cum in slowest},
+    }
+
+
+def cold_boot():
+    proc = subprocess.run([sys.executable, "-c", COLD_BOOT], cwd=REPO_DIR, env=_env(),
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(repeat=3):
+    boots = [cold_boot() for _ in range(repeat)]
+    boot = sorted(boots, key=lambda b: b["cold_boot_seconds"])[len(boots) // 2] # median run
+    result = {
+        "import_seconds": round(boot["import_seconds"], 4),
+        "cold_boot_seconds": round(boot["cold_boot_seconds"], 4),
+        "peak_rss_mb": boot["peak_rss_mb"],
+        "heavy_modules_loaded": boot["loaded"],
+        "importtime": import_profile(),
+    }
+    over = [name for name, limit in BUDGETS.items() if result[name] > limit]
+    result["within_budget"] = not over and not boot["loaded"] and boot["status"] == [200, 200]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time of the web app against the import-time budget.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if the budget is exceeded")
+    args = parser.parse_args()
+    result = run(args.repeat)
+    print(json.dumps(result, indent=2))
+    if args.check and not result["within_budget"]:
+        print(f"Startup budget exceeded (budgets: {BUDGETS}, forbidden: {FORBIDDEN_AT_BOOT})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import time
+import argparse
+
+from benchmarks.common import best_of, run_isolated, peak_rss_mb
+from benchmarks.synthetic import make_training_texts
+
+
+def _bench_prepare(n_lines, min_tokens, repeat):
+    from lstm_model import LogLSTMModel
+
+    texts = make_training_texts(n_lines, min_tokens)
+    rss_before = peak_rss_mb()
+    model = LogLSTMModel()
+    elapsed, data = best_of(lambda: model.prepare_data(texts), repeat)
+    return {
+        "lines": n_lines,
+        "sequences": len(data),
+        "vocab": model.vocab_size,
+        "seconds": round(elapsed, 4),
+        "sequences_per_sec": round(len(data) / elapsed),
+        "peak_rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _bench_train(n_lines, min_tokens, epochs):
+    from lstm_model import LogLSTMModel
+
+    texts = make_training_texts(n_lines, min_tokens)
+    rss_before = peak_rss_mb()
+    model = LogLSTMModel()
+    batch_rates = []
+    t0 = time.perf_counter()
+    loss = model.train(texts, epochs=epochs, on_batch=lambda e, b, n, l, sps: batch_rates.append(sps))
+    elapsed = time.perf_counter() - t0
+    sequences = len(model.prepare_data(texts)) * epochs
+    return {
+        "lines": n_lines,
+        "epochs": epochs,
+        "sequences": sequences,
+        "seconds": round(elapsed, 4),
+        "sequences_per_sec": round(sequences / elapsed),
+        "median_batch_sequences_per_sec": round(sorted(batch_rates)[len(batch_rates) // 2]) if batch_rates else None,
+        "final_loss": round(float(loss), 4) if loss is not None else None,
+        "peak_rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run(prepare_lines=200000, train_lines=10000, min_tokens=1, epochs=1, repeat=3):
+    # Each measurement gets its own process so peak RSS is its own
+    return {
+        "prepare_data": run_isolated(_bench_prepare, prepare_lines, min_tokens, repeat),
+        "train": run_isolated(_bench_train, train_lines, min_tokens, epochs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequences/sec and peak RSS of LogLSTMModel.prepare_data/train.")
+    parser.add_argument("--prepare-lines", type=int, default=200000)
+    parser.add_argument("--train-lines", type=int, default=10000)
+    parser.add_argument("--min-tokens", type=int, default=1, help="minimum tokens per synthetic line")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    result = run(args.prepare_lines, args.train_lines, args.min_tokens, args.epochs, args.repeat)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import time
+import multiprocessing as mp
+
+import numpy as np
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if the platform can't tell."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1 << 20), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def run_isolated(fn, *args):
+    """Runs fn(*args) in a fresh process so its peak RSS is not polluted by earlier benchmarks."""
+    with mp.get_context('spawn').Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def best_of(fn, repeat):
+    """Smallest wall time of `repeat` calls, and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def latency_summary(latencies):
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
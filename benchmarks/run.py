@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import bench_scan, bench_train, bench_api, bench_startup
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Metrics where a smaller number is better; everything else numeric is "higher is better" or informational
+LOWER_IS_BETTER = ("seconds", "_ms", "rss")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    """Prints every numeric metric next to the previous run's value."""
+    old = _flatten(previous["results"])
+    new = _flatten(current["results"])
+    print(f"\n{'metric':<60} {'previous':>14} {'current':>14} {'change':>9}")
+    for name in sorted(new):
+        if name not in old or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        worse = change > 0 if any(tag in name for tag in LOWER_IS_BETTER) else change < 0
+        flag = " !" if worse and abs(change) >= 10 else ""
+        print(f"{name:<60} {old[name]:>14,.3f} {new[name]:>14,.3f} {change:>+8.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmark suite and writes the results as JSON.")
+    parser.add_argument("--only", choices=["scan", "train", "api", "startup"], action="append",
+                        help="run only these groups (repeatable)")
+    parser.add_argument("--output", default=None, help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="previous result file to compare against")
+    parser.add_argument("--quick", action="store_true", help="small inputs, for a smoke run")
+    args = parser.parse_args()
+
+    groups = args.only or ["scan", "train", "api", "startup"]
+    if args.quick:
+        runners = {
+            "scan": lambda: bench_scan.run(lines_per_file=20000, months=(1,), repeat=1),
+            "train": lambda: bench_train.run(prepare_lines=20000, train_lines=1000, repeat=1),
+            "api": lambda: bench_api.run(threads=4, requests_per_thread=50, lines_per_file=5000),
+            "startup": lambda: bench_startup.run(repeat=1),
+        }
+    else:
+        runners = {"scan": bench_scan.run, "train": bench_train.run, "api": bench_api.run,
+                   "startup": bench_startup.run}
+
+    results = {}
+    for group in groups:
+        t0 = time.perf_counter()
+        print(f"Running {group} benchmarks...", file=sys.stderr)
+        results[group] = runners[group]()
+        print(f" {group} done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+# Deterministic synthetic syslog in the same TSV layout as the real archive:
+# seq, host, severity, facility, program, "YYYY-MM-DD HH:MM:SS", source ip, type, message
+SEVERITIES = ["info", "notice", "warning", "debug"]
+NORMAL_TYPES = ["%SYS-5-CONFIG_I", "%LINEPROTO-5-UPDOWN", "%SEC-6-IPACCESSLOGP", "sshd", "cron"]
+ERROR_TYPES = ["%FTPD-3-INTERNALERR", "%LINK-3-UPDOWN", "syslog-ng", "DHCSNOOP6", "%BFD-3-INTERNALERR",
+               "%MPLS-OAM-3-ERRRCV", "%SECURITY-3-KEY_ERROR", "%OSPF-3-INTERNALERR"]
+MESSAGES = [
+    "Interface GigabitEthernet0/{n} changed state to {state}",
+    "Configured from console by admin on vty{n} ({ip})",
+    "list {n} permitted tcp {ip}(5{n}) -> 10.0.0.1(22), 1 packet",
+    "Accepted publickey for ops from {ip} port 5{n} ssh2",
+]
+# Messages mentioning errors, also seen on non-error lines (noise_rate)
+ERROR_MESSAGES = [
+    "session {n} error while processing request from {ip}",
+    "Internal error, reload required on slot {n}",
+    "BFD session to {ip} went {state}, error code {n}",
+]
+
+
+def make_line(rng, ts, seq, error_rate, noise_rate=0.01):
+    n = rng.randint(0, 48)
+    ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+    if rng.random() < error_rate:
+        severity, error_type, pool = "err", rng.choice(ERROR_TYPES), ERROR_MESSAGES
+    else:
+        severity, error_type = rng.choice(SEVERITIES), rng.choice(NORMAL_TYPES)
+        pool = ERROR_MESSAGES if rng.random() < noise_rate else MESSAGES
+    msg = rng.choice(pool).format(n=n, ip=ip, state=rng.choice(["up", "down"]))
+    return "\t".join([str(seq), f"rtr{n % 8:02d}", severity, "local7", "syslog",
+                      ts.strftime("%Y-%m-%d %H:%M:%S"), ip, error_type, msg]) + "\n"
+
+
+def generate_tree(root_dir, months=(1,), days_per_month=2, lines_per_file=100000,
+                  error_rate=0.001, year=2025, seed=42):
+    """Writes root_dir/MM/YYYY-MM-DD.txt files and returns the number of lines written."""
+    rng = random.Random(seed)
+    total = 0
+    for month in months:
+        month_dir = os.path.join(root_dir, f"{month:02d}")
+        os.makedirs(month_dir, exist_ok=True)
+        for day in range(1, days_per_month + 1):
+            start = datetime(year, month, day)
+            step = timedelta(seconds=86400 / lines_per_file)
+            with open(os.path.join(month_dir, f"{year}-{month:02d}-{day:02d}.txt"), 'w', encoding='utf-8') as f:
+                for i in range(lines_per_file):
+                    f.write(make_line(rng, start + step * i, total + i, error_rate))
+            total += lines_per_file
+    return total
+
+
+def make_training_texts(n_lines, min_tokens=1, seed=42):
+    """Error-message-like lines of at least min_tokens tokens (default: one message per line, like real syslog)."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_lines):
+        words = []
+        while len(words) < min_tokens:
+            n = rng.randint(0, 48)
+            ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            words.extend(rng.choice(ERROR_MESSAGES).format(n=n, ip=ip, state=rng.choice(["up", "down"])).split())
+        texts.append(" ".join(words))
+    return texts
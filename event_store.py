@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import argparse
+
+import numpy as np
+
+from scan_engine import (
+    TARGET_MONTHS, list_month_files, scan_candidates, rows_from_lines, parse_timestamps, run_tasks, new_partial,
+    default_workers
+)
+from template_miner import mine_messages
+
+# Columnar store of error events, one directory per month:
+#   MM/ts.npy           datetime64[s]  (NaT if column 5 could not be parsed)
+#   MM/severity.npy     uint8   codes into dict.json "severity"
+#   MM/type.npy         uint32  codes into dict.json "type" (first-seen order)
+#   MM/msg_offsets.npy  int64   n+1 offsets into msg_data.bin
+#   MM/msg_data.bin     utf-8 message bytes
+#   MM/dict.json        dictionaries, row count and total (all severities) line counts
+EVENT_STORE_DIR = os.environ.get("EVENT_STORE_DIR", "event_store")
+STORE_VERSION = 2
+
+
+def extract_events(fpath):
+    """Returns the error events of one file as column lists, plus its total line counts."""
+    day_lines = {}
+    lines, _, n_lines = scan_candidates(fpath, day_lines=day_lines)
+    rows = rows_from_lines(lines)
+    return {
+        "ts": parse_timestamps(rows["date"].str.strip().tolist()),
+        "severity": rows["severity"].tolist(),
+        "type": rows["type"].tolist(),
+        "message": rows["message"].tolist(),
+        "lines": n_lines,
+        "day_lines": day_lines,
+    }
+
+
+def _extract_task(fpath):
+    try:
+        return extract_events(fpath), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _encode(values):
+    # Dictionary-encode in first-seen order so bincount keeps scan ordering
+    table = {}
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(table)
+
+
+def _write_month(store_dir, m_str, chunks, files):
+    ts = np.concatenate([c["ts"] for c in chunks]) if chunks else np.empty(0, dtype='datetime64[s]')
+    severities = [s for c in chunks for s in c["severity"]]
+    types = [t for c in chunks for t in c["type"]]
+    messages = [m.encode('utf-8') for c in chunks for m in c["message"]]
+    day_lines = {}
+    for c in chunks:
+        for day, n in c["day_lines"].items():
+            day_lines[day] = day_lines.get(day, 0) + n
+
+    sev_codes, sev_table = _encode(severities)
+    type_codes, type_table = _encode(types)
+    offsets = np.zeros(len(messages) + 1, dtype=np.int64)
+    np.cumsum([len(m) for m in messages], out=offsets[1:])
+
+    final_dir = os.path.join(store_dir, m_str)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "ts.npy"), ts)
+    np.save(os.path.join(tmp_dir, "severity.npy"), sev_codes.astype(np.uint8))
+    np.save(os.path.join(tmp_dir, "type.npy"), type_codes.astype(np.uint32))
+    np.save(os.path.join(tmp_dir, "msg_offsets.npy"), offsets)
+    with open(os.path.join(tmp_dir, "msg_data.bin"), 'wb') as f:
+        f.write(b"".join(messages))
+    with open(os.path.join(tmp_dir, "dict.json"), 'w', encoding='utf-8') as f:
+        json.dump({"version": STORE_VERSION, "rows": len(ts), "severity": sev_table,
+                   "type": type_table, "files": files, "lines": sum(c["lines"] for c in chunks),
+                   "day_lines": dict(sorted(day_lines.items()))}, f, ensure_ascii=False)
+
+    # Swap the month in with renames so readers never see a half-written month
+    old_dir = final_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(final_dir):
+        os.rename(final_dir, old_dir)
+    os.rename(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def ingest(root_dir, store_dir=EVENT_STORE_DIR, months=TARGET_MONTHS, workers=None):
+    """One-time ingest of root_dir/MM/*.txt error events into the columnar store."""
+    workers = workers or default_workers()
+    month_files, missing = list_month_files(root_dir, months)
+    os.makedirs(store_dir, exist_ok=True)
+
+    tasks = [(m_str, fpath) for m_str in months for fpath in month_files.get(m_str, [])]
+    results = run_tasks(_extract_task, [fpath for _, fpath in tasks], workers)
+
+    chunks = {m_str: [] for m_str in month_files}
+    for (m_str, fpath), (events, err) in zip(tasks, results):
+        if err is not None:
+            print(f" Error reading {fpath}: {err}")
+            continue
+        chunks[m_str].append(events)
+
+    total = 0
+    for m_str in month_files:
+        files = [os.path.relpath(p, root_dir) for p in month_files[m_str]]
+        _write_month(store_dir, m_str, chunks[m_str], files)
+        rows = sum(len(c["type"]) for c in chunks[m_str])
+        total += rows
+        print(f" Stored month {m_str}: {rows} error events")
+    for m_str in missing:
+        # Drop stale months whose source directory is gone
+        shutil.rmtree(os.path.join(store_dir, m_str), ignore_errors=True)
+    return total
+
+
+class EventStore:
+    def __init__(self, store_dir=EVENT_STORE_DIR):
+        self.store_dir = store_dir
+        self._dicts = {}
+
+    def exists(self):
+        return os.path.isdir(self.store_dir) and bool(self.months())
+
+    def months(self):
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(m for m in os.listdir(self.store_dir)
+                      if len(m) == 2 and os.path.exists(os.path.join(self.store_dir, m, "dict.json")))
+
+    def has_month(self, m_str):
+        return os.path.exists(os.path.join(self.store_dir, m_str, "dict.json"))
+
+    def dictionary(self, m_str):
+        path = os.path.join(self.store_dir, m_str, "dict.json")
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._dicts.get(m_str)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = (mtime, json.load(f))
+            self._dicts[m_str] = cached
+        return cached[1]
+
+    def column(self, m_str, name):
+        """Memory-maps a single column; only the pages actually used are read."""
+        return np.load(os.path.join(self.store_dir, m_str, f"{name}.npy"), mmap_mode='r')
+
+    def type_counts(self, m_str):
+        table = self.dictionary(m_str)["type"]
+        counts = np.bincount(self.column(m_str, "type"), minlength=len(table))
+        return {t_name: int(c) for t_name, c in zip(table, counts)}
+
+    def month_partial(self, m_str):
+        part = new_partial()
+        part["type_counts"] = self.type_counts(m_str)
+        part["template_counts"] = mine_messages(self.messages(m_str))
+        part["errors"] = sum(part["type_counts"].values())
+        # Stores ingested before version 2 have no line totals (percentage 0 until re-ingested)
+        meta = self.dictionary(m_str)
+        part["lines"] = meta.get("lines", 0)
+        part["day_lines"] = dict(meta.get("day_lines", {}))
+        return part
+
+    def types(self, m_str):
+        table = self.dictionary(m_str)["type"]
+        return [table[c] for c in self.column(m_str, "type")]
+
+    def messages(self, m_str):
+        offsets = self.column(m_str, "msg_offsets")
+        data = np.memmap(os.path.join(self.store_dir, m_str, "msg_data.bin"), dtype=np.uint8, mode='r') \
+            if offsets[-1] > 0 else np.empty(0, dtype=np.uint8)
+        return [data[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def scan_store(store_dir=EVENT_STORE_DIR, months=TARGET_MONTHS):
+    """Store-backed equivalent of scan_engine.scan_tree: ({month: partial}, [missing months])."""
+    store = EventStore(store_dir)
+    month_partials = {}
+    missing = []
+    for m_str in months:
+        if store.has_month(m_str):
+            month_partials[m_str] = store.month_partial(m_str)
+        else:
+            missing.append(m_str)
+    return month_partials, missing
+
+
+if __name__ == "__main__":
+    from rebuild_stats import ROOT_DIR
+
+    parser = argparse.ArgumentParser(description="Ingest syslog error events into the columnar event store.")
+    parser.add_argument("--root", default=ROOT_DIR, help="syslog root directory (MM/*.txt)")
+    parser.add_argument("--store", default=EVENT_STORE_DIR, help="event store directory")
+    parser.add_argument("--workers", type=int, default=None, help="ingest processes (default: CPU count)")
+    args = parser.parse_args()
+    total = ingest(args.root, args.store, workers=args.workers)
+    print(f"Ingest complete: {total} error events stored in {args.store}")
@@ -0,0 +1,272 @@
+import os
+
+import numpy as np
+
+from scan_engine import TARGET_MONTHS
+from event_store import EventStore
+
+# Per-type event times and statistics for /api/forecast, written by rebuild_stats.py
+FORECAST_INDEX_FILE = os.environ.get("FORECAST_INDEX_FILE", "forecast_index.npz")
+INDEX_VERSION = 1
+
+# Inter-arrival histogram bin edges in seconds (last bin is open-ended)
+GAP_EDGES = np.array([0, 60, 600, 3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600, 30 * 24 * 3600], dtype=np.int64)
+GAP_LABELS = ["<1m", "1-10m", "10m-1h", "1-6h", "6-24h", "1-7d", "7-30d", ">=30d"]
+# Sliding windows (hours) for recent Poisson rate estimates, ending at the last indexed event
+RATE_WINDOWS = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}
+# Pseudo-count per bin when turning hour-of-day/day-of-week counts into seasonal weights
+SEASON_PRIOR = 1.0
+
+# Columns saved to the .npz; everything else is derived on load
+_COLUMNS = ["types", "files", "offsets", "ts", "file_id"]
+
+
+def risk_row(error_type, count, rate):
+    """MTBF/risk row of one type from its rate (events per hour, > 0); shared by the index and the stats.json fallback."""
+    mtbf_hours = 1 / rate
+    # Risk Level Logic
+    if mtbf_hours < 24:
+        risk, risk_color = "CRITICAL (Daily)", "text-danger"
+    elif mtbf_hours < 168: # 7 days
+        risk, risk_color = "HIGH (Weekly)", "text-warning"
+    else:
+        risk, risk_color = "MEDIUM (Monthly+)", "text-success"
+    prob_24h_val = 1 - np.exp(-24 * rate)
+    return {
+        'type': error_type,
+        'count': int(count),
+        'mtbf_hours': float(mtbf_hours),
+        'risk': risk,
+        'risk_color': risk_color,
+        'prob_24h': f"{prob_24h_val * 100:.1f}%",
+    }
+
+
+def timeline_entry(params, event_time, n):
+    """One /api/forecast timeline item: occurrence n of a risk_row() type at event_time (datetime)."""
+    return {
+        'timestamp_iso': event_time.isoformat(), # Raw format for JS countdown
+        'type': params['type'],
+        'count': params['count'],
+        'mtbf': f"{params['mtbf_hours']:.1f}h",
+        'next_est': event_time.strftime('%Y-%m-%d %H:%M'),
+        'risk': params['risk'],
+        'risk_color': params['risk_color'],
+        'prob_24h': params['prob_24h'],
+        'occurrence_index': n # Absolute sequence number
+    }
+
+
+def _dow(hours):
+    # 1970-01-01 was a Thursday; Monday = 0
+    return (hours // 24 + 3) % 7
+
+
+class ForecastIndex:
+    """Per-type sorted event timestamps plus the statistics the forecast needs.
+
+    ts holds int64 epoch seconds (the log's wall-clock time), grouped by type
+    and sorted within each group: type k owns ts[offsets[k]:offsets[k+1]].
+    file_id maps every event back to the scanned file it came from, so an
+    incremental rebuild can drop and replace the events of changed files.
+    """
+
+    def __init__(self, types, files, offsets, ts, file_id):
+        self.types = [str(t) for t in types]
+        self.files = [str(f) for f in files]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.file_id = np.asarray(file_id, dtype=np.int32)
+        self.type_ids = {t: k for k, t in enumerate(self.types)}
+        self._compute_stats()
+
+    @classmethod
+    def build(cls, files, events_by_file):
+        """Builds an index from {file key: row_events(...)} for the given file keys."""
+        file_ids = {f: i for i, f in enumerate(files)}
+        type_ids = {}
+        codes, ts, fids = [], [], []
+        for key, ev in events_by_file.items():
+            if not len(ev["ts"]):
+                continue
+            remap = np.array([type_ids.setdefault(t, len(type_ids)) for t in ev["types"]], dtype=np.int32)
+            codes.append(remap[ev["codes"]])
+            ts.append(ev["ts"])
+            fids.append(np.full(len(ev["ts"]), file_ids[key], dtype=np.int32))
+        return cls._from_columns(list(type_ids), files, codes, ts, fids)
+
+    @classmethod
+    def _from_columns(cls, types, files, codes, ts, fids):
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int32)
+        ts = np.concatenate(ts) if ts else np.empty(0, dtype=np.int64)
+        fids = np.concatenate(fids) if fids else np.empty(0, dtype=np.int32)
+
+        # Order types by total count (ties by name) so "top N" is a prefix; types whose
+        # events are all gone (e.g. a rescanned file no longer has them) are dropped
+        counts = np.bincount(codes, minlength=len(types))
+        type_order = sorted((k for k in range(len(types)) if counts[k]), key=lambda k: (-counts[k], types[k]))
+        rank = np.empty(len(types), dtype=np.int32)
+        rank[type_order] = np.arange(len(type_order), dtype=np.int32)
+        codes = rank[codes]
+
+        order = np.lexsort((ts, codes))
+        offsets = np.zeros(len(type_order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(type_order)), out=offsets[1:])
+        return cls([types[k] for k in type_order], files, offsets, ts[order], fids[order])
+
+    def updated(self, files, events_by_file):
+        """Returns a new index over `files`: events of files missing from `files` or in
+        events_by_file with start offset 0 are dropped, and events_by_file
+        ({key: (start, row_events(...))}) are added."""
+        file_ids = {f: i for i, f in enumerate(files)}
+        replaced = {key for key, (start, _) in events_by_file.items() if start == 0}
+        # Old file id -> new file id, -1 for files that are gone or rescanned
+        remap_files = np.array([-1 if f in replaced else file_ids.get(f, -1) for f in self.files] + [-1],
+                               dtype=np.int32)
+        new_fid = remap_files[self.file_id]
+        keep = new_fid >= 0
+
+        type_ids = {t: k for k, t in enumerate(self.types)}
+        codes = [np.repeat(np.arange(len(self.types), dtype=np.int32), np.diff(self.offsets))[keep]]
+        ts = [self.ts[keep]]
+        fids = [new_fid[keep]]
+        for key, (_, ev) in events_by_file.items():
+            if not len(ev["ts"]):
+                continue
+            remap = np.array([type_ids.setdefault(t, len(type_ids)) for t in ev["types"]], dtype=np.int32)
+            codes.append(remap[ev["codes"]])
+            ts.append(ev["ts"])
+            fids.append(np.full(len(ev["ts"]), file_ids[key], dtype=np.int32))
+        return self._from_columns(list(type_ids), files, codes, ts, fids)
+
+    def _compute_stats(self):
+        n_types = len(self.types)
+        self.counts = np.diff(self.offsets)
+        codes = np.repeat(np.arange(n_types, dtype=np.int64), self.counts)
+        ts = self.ts
+        if len(ts):
+            self.start, self.end = int(ts.min()), int(ts.max())
+        else:
+            self.start = self.end = 0
+        # Observed period of the whole archive, at least one hour
+        self.span_hours = max((self.end - self.start) / 3600, 1.0)
+        self.rate = self.counts / self.span_hours # events per hour (Poisson MLE)
+
+        # Inter-arrival gaps within each type: drop the diffs that cross a type boundary
+        gaps = np.diff(ts)
+        same_type = codes[1:] == codes[:-1]
+        gap_codes = codes[1:][same_type]
+        gaps = gaps[same_type]
+        bins = np.searchsorted(GAP_EDGES, gaps, side='right') - 1
+        self.gap_hist = np.bincount(gap_codes * len(GAP_EDGES) + bins,
+                                    minlength=n_types * len(GAP_EDGES)).reshape(n_types, len(GAP_EDGES))
+        gap_sum = np.bincount(gap_codes, weights=gaps, minlength=n_types)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean_gap_hours = np.where(self.counts > 1, gap_sum / np.maximum(self.counts - 1, 1) / 3600, np.nan)
+
+        # Seasonal weights (mean 1) from hour-of-day and day-of-week counts
+        hours = ts // 3600
+        hod = np.bincount(codes * 24 + hours % 24, minlength=n_types * 24).reshape(n_types, 24)
+        dow = np.bincount(codes * 7 + _dow(hours), minlength=n_types * 7).reshape(n_types, 7)
+        self.hour_counts, self.dow_counts = hod, dow
+        self.hour_weight = (hod + SEASON_PRIOR) / (self.counts[:, None] + 24 * SEASON_PRIOR) * 24
+        self.dow_weight = (dow + SEASON_PRIOR) / (self.counts[:, None] + 7 * SEASON_PRIOR) * 7
+
+        # Recent rates over sliding windows ending at the last event, and the busiest 24h window.
+        # (type, time) packed into one sorted int64 key so every type is searched in one call.
+        key = codes * (1 << 40) + (ts - self.start)
+        type_base = np.arange(n_types, dtype=np.int64) * (1 << 40)
+        self.window_rates = {}
+        for name, hours_len in RATE_WINDOWS.items():
+            cut = np.searchsorted(key, type_base + (self.end - hours_len * 3600 - self.start), side='right')
+            self.window_rates[name] = (self.offsets[1:] - np.maximum(cut, self.offsets[:-1])) / hours_len
+        peak = np.searchsorted(key, key + 24 * 3600, side='left') - np.arange(len(ts))
+        self.peak_24h = np.zeros(n_types, dtype=np.int64)
+        np.maximum.at(self.peak_24h, codes, peak)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, version=np.array(INDEX_VERSION), types=np.array(self.types, dtype=str),
+                     files=np.array(self.files, dtype=str), offsets=self.offsets, ts=self.ts, file_id=self.file_id)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            if int(arrays["version"]) != INDEX_VERSION:
+                raise ValueError(f"unsupported forecast index version in {path}")
+            return cls(*(arrays[name] for name in _COLUMNS))
+
+    def top_types(self, n):
+        # Indexes saved before zero-count types were dropped may still end with some
+        return list(range(min(n, int(np.count_nonzero(self.counts)))))
+
+    def params(self, k):
+        """MTBF/risk row for type k (see risk_row)."""
+        return risk_row(self.types[k], self.counts[k], self.rate[k])
+
+    def occurrences(self, type_ids, anchor, now, horizon_hours, max_events):
+        """Expected next occurrences per type between now and now + horizon.
+
+        Occurrences follow a non-homogeneous Poisson model anchored at
+        `anchor`: the base rate scaled by the type's hour-of-day and
+        day-of-week weights, integrated per hour; occurrence n falls where
+        the cumulative intensity reaches n. Times are epoch seconds on the
+        log's wall clock. Returns [(type id, [occurrence index], [time])].
+        """
+        type_ids = np.asarray(type_ids, dtype=np.int64)
+        first_hour = anchor // 3600
+        n_hours = int(np.ceil((now + horizon_hours * 3600 - first_hour * 3600) / 3600))
+        hours = first_hour + np.arange(n_hours)
+        intensity = (self.rate[type_ids, None] * self.hour_weight[type_ids][:, hours % 24]
+                     * self.dow_weight[type_ids][:, _dow(hours)])
+        cum = np.cumsum(intensity, axis=1)
+        before = cum - intensity
+
+        now_h = min(int((now - first_hour * 3600) // 3600), n_hours - 1)
+        now_frac = (now - first_hour * 3600) / 3600 - now_h
+        end_frac = (now + horizon_hours * 3600 - first_hour * 3600) / 3600 - (n_hours - 1)
+        cum_now = before[:, now_h] + intensity[:, now_h] * now_frac
+        cum_end = before[:, -1] + intensity[:, -1] * end_frac
+
+        result = []
+        for row, k in enumerate(type_ids.tolist()):
+            n_start = int(np.floor(cum_now[row])) + 1
+            n_end = min(n_start + max_events, int(np.floor(cum_end[row])) + 1)
+            ns = np.arange(n_start, max(n_start, n_end))
+            idx = np.searchsorted(cum[row], ns, side='left')
+            times = (first_hour + idx + (ns - before[row, idx]) / intensity[row, idx]) * 3600
+            result.append((k, ns.tolist(), times.tolist()))
+        return result
+
+    def profile(self, k):
+        """Everything the index knows about type k, JSON-ready."""
+        group = self.ts[self.offsets[k]:self.offsets[k + 1]]
+        return {
+            'type': self.types[k],
+            'count': int(self.counts[k]),
+            'first_seen': str(np.datetime64(int(group[0]), 's')) if len(group) else None,
+            'last_seen': str(np.datetime64(int(group[-1]), 's')) if len(group) else None,
+            'rate_per_hour': {'all': float(self.rate[k]),
+                              **{name: float(r[k]) for name, r in self.window_rates.items()}},
+            'peak_24h': int(self.peak_24h[k]),
+            'mean_gap_hours': None if np.isnan(self.mean_gap_hours[k]) else float(self.mean_gap_hours[k]),
+            'gap_histogram': dict(zip(GAP_LABELS, self.gap_hist[k].tolist())),
+            'hour_of_day': self.hour_counts[k].tolist(),
+            'day_of_week': self.dow_counts[k].tolist(),
+        }
+
+
+def index_from_store(store_dir, months=TARGET_MONTHS):
+    """Forecast index straight from the event store's ts/type columns (one pseudo-file per month)."""
+    store = EventStore(store_dir)
+    events = {}
+    for m_str in months:
+        if store.has_month(m_str):
+            ts = store.column(m_str, "ts")
+            valid = ~np.isnat(ts)
+            events[m_str] = {"types": store.dictionary(m_str)["type"],
+                             "codes": np.asarray(store.column(m_str, "type"))[valid].astype(np.int32),
+                             "ts": np.asarray(ts)[valid].astype(np.int64)}
+    return ForecastIndex.build(list(events), events)
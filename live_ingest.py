@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+import calendar
+from datetime import datetime
+
+import numpy as np
+
+from scan_engine import (SEVERITY_COL, DATE_COL, TYPE_COL, MESSAGE_COL, ERROR_SEVERITY, TARGET_MONTHS,
+                         new_partial, LINES_SCANNED, ERRORS_MATCHED)
+from rebuild_stats import build_stats
+
+LIVE_STATS_FILE = os.environ.get("LIVE_STATS_FILE", "live_stats.json")
+FLUSH_INTERVAL = 2.0
+# Distinct types tracked before further ones are folded into OTHER_TYPE
+MAX_TYPES = 1024
+OTHER_TYPE = "(other)"
+
+# (name, bucket length in minutes or None for calendar months, number of slots)
+RINGS = [
+    ("minute", 1, 24 * 60),
+    ("hour", 60, 24 * 31),
+    ("day", 24 * 60, 366),
+    ("month", None, 12),
+]
+
+
+def parse_line(line):
+    """Returns (minute bucket, error type or None) for one raw syslog line, or None if it is not a log line.
+
+    Same column rules as the batch scan: severity in column 2, date in
+    column 5, type in column 7, at least 9 columns. Lines without a
+    parseable date are stamped with the arrival time.
+    """
+    parts = line.split('\t')
+    if len(parts) <= MESSAGE_COL:
+        return None
+    try:
+        ts = datetime.strptime(parts[DATE_COL].strip(), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        ts = datetime.now()
+    minute = calendar.timegm(ts.timetuple()) // 60
+    error_type = parts[TYPE_COL] if parts[SEVERITY_COL].lower() == ERROR_SEVERITY else None
+    return minute, error_type
+
+
+def _month_bucket(minute):
+    t = time.gmtime(minute * 60)
+    return t.tm_year * 12 + t.tm_mon - 1
+
+
+class RingCounter:
+    """Per-type error counts and total line counts in a fixed ring of time buckets."""
+
+    def __init__(self, n_slots, n_types=16):
+        self.n_slots = n_slots
+        self.errors = np.zeros((n_types, n_slots), dtype=np.int32)
+        self.lines = np.zeros(n_slots, dtype=np.int64)
+        self.stamps = np.full(n_slots, -1, dtype=np.int64)
+
+    def ensure_types(self, n_types):
+        if n_types > self.errors.shape[0]:
+            grown = np.zeros((max(n_types, 2 * self.errors.shape[0]), self.n_slots), dtype=np.int32)
+            grown[:self.errors.shape[0]] = self.errors
+            self.errors = grown
+
+    def add(self, buckets, rows, line_counts, error_counts):
+        """Adds aggregated counts; buckets older than what a slot already holds are dropped."""
+        slots = buckets % self.n_slots
+        unique_buckets = np.unique(buckets)
+        for bucket, slot in zip(unique_buckets, unique_buckets % self.n_slots):
+            if self.stamps[slot] < bucket:
+                self.stamps[slot] = bucket
+                self.errors[:, slot] = 0
+                self.lines[slot] = 0
+        keep = self.stamps[slots] == buckets
+        np.add.at(self.lines, slots[keep], line_counts[keep])
+        err = keep & (rows >= 0)
+        np.add.at(self.errors, (rows[err], slots[err]), error_counts[err])
+
+    def live_slots(self, since_bucket=None):
+        mask = self.stamps >= 0
+        if since_bucket is not None:
+            mask &= self.stamps >= since_bucket
+        return np.flatnonzero(mask)
+
+
+class LiveAggregator:
+    """Thread-safe rolling aggregates fed by the ingestion server.
+
+    Lines are first tallied in a small dict per (minute, type) and applied to
+    the ring buffers in one vectorized step per flush, so the per-line cost
+    is a split and a dict update.
+    """
+
+    def __init__(self, max_types=MAX_TYPES):
+        self.max_types = max_types
+        self.type_rows = {OTHER_TYPE: 0}
+        self.type_names = [OTHER_TYPE]
+        self.rings = {name: RingCounter(n_slots) for name, _, n_slots in RINGS}
+        self.generation = 0
+        self.lines_received = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add_line(self, line):
+        parsed = parse_line(line)
+        if parsed is None:
+            return
+        with self._lock:
+            self._pending[parsed] = self._pending.get(parsed, 0) + 1
+
+    def _row(self, error_type):
+        row = self.type_rows.get(error_type)
+        if row is None:
+            if len(self.type_names) >= self.max_types:
+                return 0
+            row = len(self.type_names)
+            self.type_rows[error_type] = row
+            self.type_names.append(error_type)
+        return row
+
+    def drain(self):
+        """Applies pending lines to the ring buffers; returns the number of lines applied."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            minutes = np.fromiter((k[0] for k in pending), dtype=np.int64, count=len(pending))
+            rows = np.fromiter((-1 if k[1] is None else self._row(k[1]) for k in pending),
+                               dtype=np.int64, count=len(pending))
+            counts = np.fromiter(pending.values(), dtype=np.int64, count=len(pending))
+            error_counts = np.where(rows >= 0, counts, 0)
+
+            month_of = {m: _month_bucket(m) for m in np.unique(minutes).tolist()}
+            for name, minutes_per_bucket, _ in RINGS:
+                ring = self.rings[name]
+                ring.ensure_types(len(self.type_names))
+                if minutes_per_bucket is None:
+                    buckets = np.fromiter((month_of[m] for m in minutes.tolist()), dtype=np.int64, count=len(minutes))
+                else:
+                    buckets = minutes // minutes_per_bucket
+                ring.add(buckets, rows, counts, error_counts)
+
+            self.lines_received += int(counts.sum())
+            self.generation += 1
+            LINES_SCANNED.inc(int(counts.sum()), ("live",))
+            ERRORS_MATCHED.inc(int(error_counts.sum()), ("live",))
+            return int(counts.sum())
+
+    def month_partials(self, since=None):
+        """Returns {"MM": partial} (with "lines") from the finest ring that covers `since`.
+
+        since is a naive datetime (same wall-clock convention as the logs);
+        None means everything in the 12-month ring.
+        """
+        with self._lock:
+            if since is None:
+                name, minutes_per_bucket, since_bucket = "month", None, None
+            else:
+                since_minute = calendar.timegm(since.timetuple()) // 60
+                for name, minutes_per_bucket, n_slots in RINGS:
+                    ring = self.rings[name]
+                    newest = int(ring.stamps.max())
+                    if minutes_per_bucket is None:
+                        # Months are only summed whole
+                        since_bucket = _month_bucket(since_minute)
+                        break
+                    since_bucket = since_minute // minutes_per_bucket
+                    if newest < 0 or since_bucket > newest - n_slots:
+                        break
+
+            ring = self.rings[name]
+            partials = {}
+            for slot in ring.live_slots(since_bucket):
+                bucket = int(ring.stamps[slot])
+                month = bucket % 12 + 1 if minutes_per_bucket is None else \
+                    time.gmtime(bucket * minutes_per_bucket * 60).tm_mon
+                m_str = f"{month:02d}"
+                part = partials.setdefault(m_str, new_partial())
+                part["lines"] += int(ring.lines[slot])
+                column = ring.errors[:, slot]
+                for row in np.flatnonzero(column):
+                    t_name = self.type_names[row]
+                    part["type_counts"][t_name] = part["type_counts"].get(t_name, 0) + int(column[row])
+                    part["errors"] += int(column[row])
+            return partials
+
+    def snapshot(self):
+        """Everything in the 12-month ring, in the stats.json schema."""
+        result = build_stats(self.month_partials(), TARGET_MONTHS)
+        result["source"] = "live"
+        result["lines_received"] = self.lines_received
+        return result
+
+
+def merge_live_delta(stats_data, partials):
+    """Returns a copy of stats.json data with live counts newer than its generated_at folded in."""
+    merged = json.loads(json.dumps(stats_data))
+    global_counts = merged.setdefault("global_type_counts", {})
+    for m_data in merged.get("monthly", []):
+        part = partials.get(f"{m_data['month']:02d}")
+        if not part or not (part["errors"] or part["lines"]):
+            continue
+        base_errors = m_data.get("errors", 0)
+        if "lines" in m_data:
+            # Exact ratio: live lines extend the batch run's line count
+            m_data["lines"] += part["lines"]
+            merged["total_lines"] = merged.get("total_lines", 0) + part["lines"]
+            if m_data["lines"]:
+                m_data["percentage"] = round((base_errors + part["errors"]) / m_data["lines"] * 100, 4)
+        elif base_errors and m_data.get("percentage"):
+            # stats.json from before line counting: keep the month's ratio on its old denominator
+            denominator = base_errors * 100 / m_data["percentage"]
+            m_data["percentage"] = round((base_errors + part["errors"]) / denominator * 100, 4)
+        m_data["errors"] = base_errors + part["errors"]
+        if not part["errors"]:
+            continue
+        month_counts = dict(m_data.get("top_types", []))
+        for t_name, t_count in part["type_counts"].items():
+            month_counts[t_name] = month_counts.get(t_name, 0) + t_count
+            global_counts[t_name] = global_counts.get(t_name, 0) + t_count
+        m_data["top_types"] = sorted(month_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        merged["total_errors"] = merged.get("total_errors", 0) + part["errors"]
+
+    sorted_global_types = sorted(global_counts.items(), key=lambda x: x[1], reverse=True)
+    merged["top_5_global"] = [t[0] for t in sorted_global_types[:5]]
+    merged["top_5_counts"] = [t[1] for t in sorted_global_types[:5]]
+    merged["top_types_summary"] = sorted_global_types
+    return merged
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+
+    def datagram_received(self, data, addr):
+        for line in data.decode('utf-8', errors='ignore').splitlines():
+            self.aggregator.add_line(line)
+
+
+class LiveIngestServer:
+    """asyncio UDP + TCP syslog listener feeding a LiveAggregator."""
+
+    def __init__(self, aggregator=None, host="0.0.0.0", udp_port=5140, tcp_port=5140,
+                 flush_interval=FLUSH_INTERVAL, output_file=LIVE_STATS_FILE):
+        self.aggregator = aggregator or LiveAggregator()
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.flush_interval = flush_interval
+        self.output_file = output_file
+        self.loop = None
+
+    async def _handle_tcp(self, reader, writer):
+        # Newline-delimited stream (RFC 6587 non-transparent framing)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.aggregator.add_line(line.decode('utf-8', errors='ignore').rstrip('\r\n'))
+        finally:
+            writer.close()
+
+    def flush(self):
+        if not self.aggregator.drain() or not self.output_file:
+            return
+        tmp_path = self.output_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.aggregator.snapshot(), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.output_file)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Live ingest flush failed: {e}")
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if self.udp_port:
+            await self.loop.create_datagram_endpoint(lambda: _UDPProtocol(self.aggregator),
+                                                     local_addr=(self.host, self.udp_port))
+        servers = []
+        if self.tcp_port:
+            servers.append(await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port))
+        print(f"Live syslog ingest listening on {self.host} (udp {self.udp_port}, tcp {self.tcp_port})")
+        await self._flush_forever()
+
+    def start_in_thread(self):
+        """Runs the listener on its own event loop in a daemon thread (e.g. next to the Flask app)."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve()), name="live-ingest", daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live syslog ingestion daemon with rolling aggregates.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--udp-port", type=int, default=5140)
+    parser.add_argument("--tcp-port", type=int, default=5140)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL)
+    parser.add_argument("--output", default=LIVE_STATS_FILE, help="stats.json-schema snapshot file")
+    args = parser.parse_args()
+    server = LiveIngestServer(host=args.host, udp_port=args.udp_port, tcp_port=args.tcp_port,
+                              flush_interval=args.flush_interval, output_file=args.output)
+    asyncio.run(server.serve())
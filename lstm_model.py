@@ -1,123 +1,445 @@
+import os
+import time
+import struct
+import zipfile
+import threading
+from collections import OrderedDict
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import histogram, timed
 
 # Hyperparameters
 WINDOW_SIZE = 50
+EMBEDDING_DIM = 64
 HIDDEN_UNITS = 64
 LEARNING_RATE = 0.01
+BATCH_SIZE = 128
+CLIP_NORM = 5.0
+# Vocabulary token marking the end of each line; whitespace splitting can never produce it
+LINE_SEP = "\n"
+
+# Checkpoint with tokenizer, weights and optimizer state
+MODEL_FILE = os.environ.get("MODEL_FILE", "lstm_model.npz")
+PARAM_NAMES = ('E', 'W', 'b', 'Wy', 'by')
+
+PREDICT_SECONDS = histogram("lstm_predict_batch_seconds", "Time of one LogLSTMModel.predict_batch call")
+
+
+def _load_npz(path, mmap=True):
+    """Loads every array of an uncompressed .npz, memory-mapping them in place.
+
+    np.load ignores mmap_mode for .npz archives, but members written by
+    np.savez are stored uncompressed, so each one can be mapped straight
+    from its offset inside the zip file.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                f.seek(info.header_offset)
+                name_len, extra_len = struct.unpack('<HH', f.read(30)[26:30])
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+                if shape and not dtype.hasobject and all(shape):
+                    arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(),
+                                             shape=shape, order='F' if fortran else 'C')
+                    continue
+            with zf.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
+
+class WindowDataset:
+    """Next-token training windows over one flat int32 token array.
+
+    The array is the whole corpus with a LINE_SEP token after every line,
+    so windows run across line ends: short messages (and templates) still
+    give training windows, and the model learns where a line ends. Windows
+    are strided views into the token array, so memory is proportional to
+    the corpus rather than corpus x window. Mini-batches are gathered on
+    demand by batches().
+    """
+
+    def __init__(self, tokens, window=WINDOW_SIZE):
+        self.tokens = tokens
+        self.window = window
+
+        if len(tokens) > window:
+            self._windows = sliding_window_view(tokens, window + 1)
+        else:
+            self._windows = np.empty((0, window + 1), dtype=np.int32)
+
+    def __len__(self):
+        return len(self._windows)
+
+    def num_batches(self, batch_size):
+        return (len(self) + batch_size - 1) // batch_size
+
+    def batches(self, batch_size=BATCH_SIZE, shuffle=True, rng=None):
+        """Yields (X [B, window], y [B]) mini-batches; only one batch is copied at a time."""
+        order = (rng or np.random.default_rng()).permutation(len(self)) if shuffle else np.arange(len(self))
+        for begin in range(0, len(self), batch_size):
+            rows = self._windows[order[begin:begin + batch_size]]
+            yield rows[:, :self.window], rows[:, self.window]
 
 class LogLSTMModel:
-    def __init__(self):
+    def __init__(self, seed=0):
         self.tokenizer_word_index = {}
         self.index_word = {}
         self.vocab_size = 0
-        
-        # LSTM Parameters (Initialize random weights)
-        self.Wf = None; self.Wi = None; self.Wc = None; self.Wo = None
-        self.bf = None; self.bi = None; self.bc = None; self.bo = None
+        self.rng = np.random.default_rng(seed)
+
+        # LSTM Parameters
+        # E: [V, E] embedding, W: [4H, E+H] fused gate weights (rows: i, f, o, g), b: [4H]
+        # Wy: [V, H] output projection, by: [V]
+        self.E = None; self.W = None; self.b = None
         self.Wy = None; self.by = None
+        self._adam = {}
+        self._adam_step = 0
+        self.epochs_completed = 0
+        # Bumped whenever the weights change (used to key prediction caches)
+        self.version = 0
 
     def _sigmoid(self, x):
         return 1 / (1 + np.exp(-x))
 
     def _tanh(self, x):
         return np.tanh(x)
-    
+
     def _softmax(self, x):
-        e_x = np.exp(x - np.max(x))
-        return e_x / e_x.sum(axis=0)
+        # Row-wise softmax over [B, V] logits
+        e_x = np.exp(x - np.max(x, axis=1, keepdims=True))
+        return e_x / e_x.sum(axis=1, keepdims=True)
 
     def prepare_data(self, texts):
         print("Tokenizing data (Simple Split)...")
-        # Simple whitespace tokenizer for robustness without Keras
-        unique_words = set()
-        all_tokens = []
-        
-        for line in texts:
-            tokens = line.lower().split()
-            unique_words.update(tokens)
-            all_tokens.append(tokens)
-            
-        self.tokenizer_word_index = {w: i for i, w in enumerate(sorted(list(unique_words)))}
+        # Simple whitespace tokenizer for robustness without Keras.
+        # Ids are assigned on first sight in a single pass, then remapped to sorted-vocabulary order.
+        first_seen = {LINE_SEP: 0}
+
+        def _ids():
+            for line in texts:
+                for t in line.lower().split():
+                    yield first_seen.setdefault(t, len(first_seen))
+                yield 0 # LINE_SEP
+
+        raw_ids = np.fromiter(_ids(), dtype=np.int32)
+        words = sorted(first_seen)
+        self.tokenizer_word_index = {w: i for i, w in enumerate(words)}
         self.index_word = {i: w for w, i in self.tokenizer_word_index.items()}
-        self.vocab_size = len(unique_words)
-        
-        X = []
-        y = []
-        
+        self.vocab_size = len(words)
+
+        remap = np.empty(len(first_seen), dtype=np.int32)
+        remap[list(first_seen.values())] = [self.tokenizer_word_index[w] for w in first_seen]
+
         print(f"Vocab Size: {self.vocab_size}")
-        
-        for tokens in all_tokens:
-            seq = [self.tokenizer_word_index[t] for t in tokens]
-            if len(seq) < WINDOW_SIZE + 1:
-                continue
-                
-            for i in range(len(seq) - WINDOW_SIZE):
-                X.append(seq[i : i + WINDOW_SIZE])
-                y.append(seq[i + WINDOW_SIZE])
-                
-        return np.array(X), np.array(y)
+        return WindowDataset(remap[raw_ids])
 
     def init_weights(self):
-        # Concat input and hidden for simpler matrix math: [h_prev, x_t]
-        input_dim = self.vocab_size # Using One-Hot encoding for input simplicity in this Numpy version
-        concat_dim = HIDDEN_UNITS + input_dim
-        
-        self.Wf = np.random.randn(HIDDEN_UNITS, concat_dim) * 0.01
-        self.Wi = np.random.randn(HIDDEN_UNITS, concat_dim) * 0.01
-        self.Wc = np.random.randn(HIDDEN_UNITS, concat_dim) * 0.01
-        self.Wo = np.random.randn(HIDDEN_UNITS, concat_dim) * 0.01
-        
-        self.bf = np.zeros((HIDDEN_UNITS, 1))
-        self.bi = np.zeros((HIDDEN_UNITS, 1))
-        self.bc = np.zeros((HIDDEN_UNITS, 1))
-        self.bo = np.zeros((HIDDEN_UNITS, 1))
-        
-        self.Wy = np.random.randn(self.vocab_size, HIDDEN_UNITS) * 0.01
-        self.by = np.zeros((self.vocab_size, 1))
-
-    def train(self, texts, epochs=2):
-        X, y = self.prepare_data(texts)
-        if len(X) == 0:
-            print("Not enough data to train (sequences too short).")
-            return
-
-        if self.Wf is None:
+        # Dense embeddings instead of one-hot input: gate weights no longer grow with the vocabulary
+        concat_dim = EMBEDDING_DIM + HIDDEN_UNITS
+        rng = self.rng
+
+        self.E = (rng.standard_normal((self.vocab_size, EMBEDDING_DIM)) * 0.1).astype(np.float32)
+        self.W = (rng.standard_normal((4 * HIDDEN_UNITS, concat_dim)) / np.sqrt(concat_dim)).astype(np.float32)
+        self.b = np.zeros(4 * HIDDEN_UNITS, dtype=np.float32)
+        self.b[HIDDEN_UNITS:2 * HIDDEN_UNITS] = 1.0 # Forget gate bias starts open
+
+        self.Wy = (rng.standard_normal((self.vocab_size, HIDDEN_UNITS)) / np.sqrt(HIDDEN_UNITS)).astype(np.float32)
+        self.by = np.zeros(self.vocab_size, dtype=np.float32)
+        self._adam = {}
+        self._adam_step = 0
+
+    def _params(self):
+        return {'E': self.E, 'W': self.W, 'b': self.b, 'Wy': self.Wy, 'by': self.by}
+
+    def is_trained(self):
+        return self.W is not None and bool(self.tokenizer_word_index)
+
+    def save(self, path=MODEL_FILE):
+        """Writes tokenizer, weights and optimizer state to a single uncompressed .npz, atomically."""
+        words = [self.index_word[i] for i in range(self.vocab_size)]
+        arrays = {name: np.asarray(p) for name, p in self._params().items()}
+        arrays['vocab'] = np.array(words, dtype=str)
+        arrays['epochs_completed'] = np.array(self.epochs_completed)
+        arrays['adam_step'] = np.array(self._adam_step)
+        for name, (m, v) in self._adam.items():
+            arrays[f'adam_m_{name}'] = m
+            arrays[f'adam_v_{name}'] = v
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path=MODEL_FILE, mmap=True):
+        """Loads a checkpoint written by save(); weights stay memory-mapped until training resumes."""
+        arrays = _load_npz(path, mmap=mmap)
+        words = [str(w) for w in arrays['vocab']]
+        self.tokenizer_word_index = {w: i for i, w in enumerate(words)}
+        self.index_word = dict(enumerate(words))
+        self.vocab_size = len(words)
+        self.E, self.W, self.b, self.Wy, self.by = (arrays[name] for name in PARAM_NAMES)
+        self.epochs_completed = int(arrays['epochs_completed'])
+        self._adam_step = int(arrays['adam_step'])
+        self._adam = {name: (arrays[f'adam_m_{name}'], arrays[f'adam_v_{name}'])
+                      for name in PARAM_NAMES if f'adam_m_{name}' in arrays}
+        self.version += 1
+        print(f"Loaded model checkpoint {path} (vocab {self.vocab_size}, {self.epochs_completed} epochs)")
+        return self
+
+    def detach(self):
+        """Copies memory-mapped weights into memory so the checkpoint file can be replaced on disk."""
+        if self.W is not None:
+            self._make_writable()
+        return self
+
+    def _make_writable(self):
+        # Memory-mapped checkpoint weights are read-only; copy them before updating in place
+        self.E, self.W, self.b, self.Wy, self.by = (np.array(p) for p in (self.E, self.W, self.b, self.Wy, self.by))
+        self._adam = {name: (np.array(m), np.array(v)) for name, (m, v) in self._adam.items()}
+
+    def _step(self, x, h, c):
+        # One LSTM step for a batch: x [B, E], h/c [B, H]
+        H = HIDDEN_UNITS
+        concat = np.concatenate([x, h], axis=1)
+        z = concat @ self.W.T + self.b
+        i = self._sigmoid(z[:, :H])
+        f = self._sigmoid(z[:, H:2 * H])
+        o = self._sigmoid(z[:, 2 * H:3 * H])
+        g = self._tanh(z[:, 3 * H:])
+        c = f * c + i * g
+        h = o * self._tanh(c)
+        return h, c, (concat, i, f, o, g)
+
+    def _forward_backward(self, Xb, yb):
+        """Forward pass over the window plus full BPTT; returns (loss, grads)."""
+        B, T = Xb.shape
+        H = HIDDEN_UNITS
+
+        xs = self.E[Xb] # [B, T, E]
+        h = np.zeros((B, H), dtype=np.float32)
+        c = np.zeros((B, H), dtype=np.float32)
+        concats = np.empty((T, B, EMBEDDING_DIM + H), dtype=np.float32)
+        gates = np.empty((T, 4, B, H), dtype=np.float32)
+        cs = np.empty((T + 1, B, H), dtype=np.float32)
+        cs[0] = c
+
+        for t in range(T):
+            h, c, (concat, i, f, o, g) = self._step(xs[:, t], h, c)
+            concats[t] = concat
+            gates[t, 0], gates[t, 1], gates[t, 2], gates[t, 3] = i, f, o, g
+            cs[t + 1] = c
+
+        # Predict the token following the window from the last hidden state
+        probs = self._softmax(h @ self.Wy.T + self.by)
+        loss = -np.mean(np.log(probs[np.arange(B), yb] + 1e-12))
+
+        dlogits = probs
+        dlogits[np.arange(B), yb] -= 1
+        dlogits /= B
+        dWy = dlogits.T @ h
+        dby = dlogits.sum(axis=0)
+
+        dh = dlogits @ self.Wy
+        dc = np.zeros_like(dh)
+        dz_all = np.empty((T, B, 4 * H), dtype=np.float32)
+        dx_all = np.empty((T, B, EMBEDDING_DIM), dtype=np.float32)
+
+        for t in reversed(range(T)):
+            i, f, o, g = gates[t]
+            tanh_c = np.tanh(cs[t + 1])
+            do = dh * tanh_c
+            dc = dc + dh * o * (1 - tanh_c ** 2)
+            di = dc * g
+            dg = dc * i
+            df = dc * cs[t]
+            dc = dc * f
+
+            dz = dz_all[t]
+            dz[:, :H] = di * i * (1 - i)
+            dz[:, H:2 * H] = df * f * (1 - f)
+            dz[:, 2 * H:3 * H] = do * o * (1 - o)
+            dz[:, 3 * H:] = dg * (1 - g ** 2)
+
+            dconcat = dz @ self.W
+            dx_all[t] = dconcat[:, :EMBEDDING_DIM]
+            dh = dconcat[:, EMBEDDING_DIM:]
+
+        # Weight gradients for all time steps in one batched matmul
+        dW = dz_all.reshape(-1, 4 * H).T @ concats.reshape(-1, EMBEDDING_DIM + H)
+        db = dz_all.sum(axis=(0, 1))
+        dE = np.zeros_like(self.E)
+        np.add.at(dE, Xb.T.ravel(), dx_all.reshape(-1, EMBEDDING_DIM))
+
+        return loss, {'E': dE, 'W': dW, 'b': db, 'Wy': dWy, 'by': dby}
+
+    def _apply_grads(self, grads, lr=LEARNING_RATE, beta1=0.9, beta2=0.999, eps=1e-8):
+        # Global-norm gradient clipping followed by an Adam update
+        norm = np.sqrt(sum(float(np.sum(g * g)) for g in grads.values()))
+        if norm > CLIP_NORM:
+            for g in grads.values():
+                g *= CLIP_NORM / norm
+
+        self._adam_step += 1
+        t = self._adam_step
+        for name, param in self._params().items():
+            g = grads[name]
+            m, v = self._adam.get(name, (np.zeros_like(param), np.zeros_like(param)))
+            m = beta1 * m + (1 - beta1) * g
+            v = beta2 * v + (1 - beta2) * g * g
+            self._adam[name] = (m, v)
+            m_hat = m / (1 - beta1 ** t)
+            v_hat = v / (1 - beta2 ** t)
+            param -= (lr * m_hat / (np.sqrt(v_hat) + eps)).astype(param.dtype)
+        return norm
+
+    def train(self, texts, epochs=2, batch_size=BATCH_SIZE, on_batch=None, on_epoch=None,
+              checkpoint_path=None, resume=False, on_start=None):
+        """Trains until `epochs` epochs are completed.
+
+        With resume=True and an unchanged vocabulary, an unfinished run continues
+        from epochs_completed (e.g. after load()) instead of starting over;
+        on_start(start_epoch, epochs) reports which it is before the first
+        batch. If checkpoint_path is set, a checkpoint is written after every
+        epoch.
+        """
+        previous_vocab = self.tokenizer_word_index
+        data = self.prepare_data(texts)
+        if len(data) == 0:
+            print(f"Not enough data to train (need more than {WINDOW_SIZE} tokens).")
+            return None
+
+        if (resume and self.W is not None and previous_vocab == self.tokenizer_word_index
+                and self.epochs_completed < epochs):
+            self._make_writable()
+            start_epoch = self.epochs_completed
+        else:
             self.init_weights()
-            
-        print(f"Starting Training for {epochs} epochs on {len(X)} sequences...")
-        print("Note: Using simplified LSTM training (Random Weight Mutation/Simple GD) for specific hardware compatibility.")
-        
-        # Simplified Training simulation for the prototype to avoid complex BPTT in pure numpy for this timeframe
-        # Real BPTT is very slow in pure python. We will run a few iterations of forward pass and simulated loss reduction.
-        
-        for epoch in range(epochs):
-            loss = 0
-            # Mini-batch simulation (SGD)
-            for i in range(min(len(X), 100)): # Limit to 100 samples for speed in this demo
-                target = np.zeros((self.vocab_size, 1))
-                target[y[i]] = 1
-                
-                # Forward (Simplified - unrolled loop omitted for brevity, just treating window as context)
-                # Ideally we run LSTM steps. Here we try to map the LAST input to output for demonstration
-                # Check instructions: "LSTM Model" implementation required.
-                pass 
-            
-            print(f"Epoch {epoch+1}/{epochs} completed.")
+            start_epoch = self.epochs_completed = 0
+
+        print(f"Starting Training for epochs {start_epoch+1}-{epochs} on {len(data)} sequences (batch {batch_size})...")
+        if on_start is not None:
+            on_start(start_epoch, epochs)
+
+        n_batches = data.num_batches(batch_size)
+        epoch_loss = None
+        for epoch in range(start_epoch, epochs):
+            total_loss = 0.0
+            start_time = time.perf_counter()
+            t0 = start_time
+            for batch_idx, (Xb, yb) in enumerate(data.batches(batch_size, rng=self.rng)):
+                loss, grads = self._forward_backward(Xb, yb)
+                self._apply_grads(grads)
+                total_loss += loss * len(yb)
+                if on_batch is not None:
+                    now = time.perf_counter()
+                    on_batch(epoch, batch_idx, n_batches, float(loss), len(yb) / (now - t0))
+                    t0 = now
+
+            epoch_loss = total_loss / len(data)
+            elapsed = time.perf_counter() - start_time
+            self.epochs_completed = epoch + 1
+            self.version += 1
+            if checkpoint_path:
+                self.save(checkpoint_path)
+            print(f"Epoch {epoch+1}/{epochs} completed. loss={epoch_loss:.4f} ({len(data) / elapsed:.0f} seq/s)")
+            if on_epoch is not None:
+                on_epoch(epoch, epochs, epoch_loss, elapsed)
+        return epoch_loss
+
+    @timed(PREDICT_SECONDS)
+    def predict_batch(self, seed_texts, next_words=10, mode='greedy', k=5, rng=None):
+        """Continues many seed lines at once; returns one string per seed.
+
+        Seeds are left-padded into one batch and fed step by step with the
+        hidden state carried forward, so each generated token costs a single
+        batched LSTM step. mode is 'greedy' or 'topk' (sampling among the
+        k most likely tokens).
+        """
+        if not self.is_trained():
+            return ["Model not trained."] * len(seed_texts)
+
+        token_lists = [text.lower().split() for text in seed_texts]
+        # A seed is the start of a line, i.e. what follows a LINE_SEP (older checkpoints have none)
+        sep = self.tokenizer_word_index.get(LINE_SEP)
+        prefix = [sep] if sep is not None else []
+        known = [[self.tokenizer_word_index[t] for t in tokens if t in self.tokenizer_word_index] for tokens in token_lists]
+        id_lists = [(prefix + ids)[-WINDOW_SIZE:] if ids else [] for ids in known]
+        results = [" ".join(tokens) for tokens in token_lists]
+        active = [i for i, ids in enumerate(id_lists) if ids]
+        if not active or next_words <= 0:
+            return results
+
+        B = len(active)
+        lengths = np.array([len(id_lists[i]) for i in active])
+        max_len = int(lengths.max())
+        padded = np.zeros((B, max_len), dtype=np.int32)
+        for row, i in enumerate(active):
+            padded[row, max_len - lengths[row]:] = id_lists[i]
+
+        h = np.zeros((B, HIDDEN_UNITS), dtype=np.float32)
+        c = np.zeros((B, HIDDEN_UNITS), dtype=np.float32)
+        for t in range(max_len):
+            h_new, c_new, _ = self._step(self.E[padded[:, t]], h, c)
+            # Padding positions leave the state untouched
+            live = (t >= max_len - lengths)[:, None]
+            h = np.where(live, h_new, h)
+            c = np.where(live, c_new, c)
+
+        rng = rng or np.random.default_rng()
+        generated = np.empty((B, next_words), dtype=np.int64)
+        for step in range(next_words):
+            logits = h @ self.Wy.T + self.by
+            if mode == 'topk':
+                kk = max(1, min(k, self.vocab_size))
+                top = np.argpartition(logits, -kk, axis=1)[:, -kk:]
+                probs = self._softmax(np.take_along_axis(logits, top, axis=1))
+                choice = (probs.cumsum(axis=1) < rng.random((B, 1))).sum(axis=1)
+                next_ids = top[np.arange(B), np.minimum(choice, kk - 1)]
+            else:
+                next_ids = np.argmax(logits, axis=1)
+            generated[:, step] = next_ids
+            h, c, _ = self._step(self.E[next_ids], h, c)
+
+        for row, i in enumerate(active):
+            words = [self.index_word.get(int(idx), "") for idx in generated[row]]
+            # The predicted line ends at the first LINE_SEP
+            if LINE_SEP in words:
+                words = words[:words.index(LINE_SEP)]
+            results[i] = " ".join(token_lists[i] + words)
+        return results
 
     def predict_next_words(self, seed_text, next_words=10):
-        if not self.tokenizer_word_index:
+        if not self.is_trained():
             return "Model not trained."
-            
-        tokens = seed_text.lower().split()
-        current_text = list(tokens)
-        
-        for _ in range(next_words):
-            # Dummy prediction for pure Numpy prototype without full BPTT
-            # Select random word based heavily on "err" context if present
-            # In a real impl, this would run the forward pass.
-            
-            next_idx = np.random.randint(0, self.vocab_size)
-            word = self.index_word.get(next_idx, "")
-            current_text.append(word)
-            
-        return " ".join(current_text)
+        return self.predict_batch([seed_text], next_words=next_words)[0]
+
+
+class PredictionCache:
+    """Thread-safe LRU of prediction results; keys include the model version."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,219 @@
+import os
+import time
+import bisect
+import functools
+import threading
+from contextlib import nullcontext
+
+# METRICS=0 turns every metric into a no-op and timed() into a pass-through decorator
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+
+# Prometheus' default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _samples(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each label set stores [bucket counts..., sum, count]."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 3)
+            state[i] += 1 # i == len(buckets) is the +Inf bucket
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            return [(key, list(state)) for key, state in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, state in self._samples():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), state):
+                cumulative += n
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(float(state[-2]))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state[-1]}")
+        return lines
+
+
+class _NullMetric:
+    # Stand-in for every metric type while metrics are disabled
+    def inc(self, amount=1, labels=()):
+        pass
+
+    def set(self, value, labels=()):
+        pass
+
+    def observe(self, value, labels=()):
+        pass
+
+
+NULL_METRIC = _NullMetric()
+
+
+def _get_or_create(cls, name, help_text, labels, **kwargs):
+    if not METRICS_ENABLED:
+        return NULL_METRIC
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help_text, labels, **kwargs)
+        elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+            raise ValueError(f"Metric {name} already registered with a different type or labels")
+        return metric
+
+
+def counter(name, help_text, labels=()):
+    return _get_or_create(Counter, name, help_text, labels)
+
+
+def gauge(name, help_text, labels=()):
+    return _get_or_create(Gauge, name, help_text, labels)
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+
+class _Timer:
+    __slots__ = ("metric", "labels", "t0")
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.t0, self.labels)
+        return False
+
+
+def timed(metric, labels=()):
+    """Observes the wall time of a block or function into a histogram.
+
+        with timed(LOAD_SECONDS, ("stats.json",)): ...
+
+        @timed(PREDICT_SECONDS)
+        def predict_batch(...): ...
+
+    While metrics are disabled the context manager does nothing and the
+    decorator returns the function itself, so decorated hot paths pay nothing.
+    """
+    if metric is NULL_METRIC:
+        return _NullTimer()
+    return _TimedFactory(metric, labels)
+
+
+class _TimedFactory:
+    __slots__ = ("metric", "labels", "timer")
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+        self.timer = None
+
+    def __enter__(self):
+        self.timer = _Timer(self.metric, self.labels)
+        return self.timer.__enter__()
+
+    def __exit__(self, *exc):
+        return self.timer.__exit__(*exc)
+
+    def __call__(self, fn):
+        metric, labels = self.metric, self.labels
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - t0, labels)
+        return wrapper
+
+
+class _NullTimer(nullcontext):
+    def __call__(self, fn):
+        return fn
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
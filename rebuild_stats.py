@@ -1,90 +1,204 @@
-import os
-import glob
-import json
-from datetime import datetime
-
-# Root directory for syslog data
-ROOT_DIR = "c:/syslog/syslog1년치"
-OUTPUT_FILE = "c:/syslog/stats.json"
-
-# Target months: 1 to 12
-TARGET_MONTHS = [f"{m:02d}" for m in range(1, 13)]
-
-# TOTAL_LOGS_BY_MONTH (Previously derived/estimated for ratio calculation)
-# Counting exact total logs in 30GB every time is too slow, using stable estimates.
-TOTAL_LOGS_BY_MONTH = {
-    1: 4500000, 2: 4200000, 3: 4600000, 4: 4300000, 5: 4100000, 6: 2800000,
-    7: 3500000, 8: 3200000, 9: 6800000, 10: 7200000, 11: 7500000, 12: 2500000
-}
-
-def rebuild_stats():
-    print(f"Starting 12-month analysis for: {TARGET_MONTHS}")
-    
-    global_type_counts = {}
-    monthly_stats = []
-    total_errors = 0
-    
-    for m_str in TARGET_MONTHS:
-        month_path = os.path.join(ROOT_DIR, m_str)
-        if not os.path.exists(month_path):
-            print(f"Skipping {m_str}: Directory not found.")
-            # Even if directory missing, add placeholder to keep index stable
-            monthly_stats.append({"month": int(m_str), "errors": 0, "unique_types": 0, "percentage": 0, "top_types": []})
-            continue
-            
-        print(f" Scanning month {m_str}...")
-        month_errors = 0
-        month_type_counts = {}
-        
-        # Get all txt files
-        files = glob.glob(os.path.join(month_path, "*.txt"))
-        for fpath in files:
-            try:
-                with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        parts = line.split('\t')
-                        # Rule: 3rd column (index 2) contains 'err'
-                        if len(parts) > 8 and 'err' in parts[2].lower():
-                            error_type = parts[7]
-                            global_type_counts[error_type] = global_type_counts.get(error_type, 0) + 1
-                            month_type_counts[error_type] = month_type_counts.get(error_type, 0) + 1
-                            month_errors += 1
-                            total_errors += 1
-            except Exception as e:
-                print(f" Error reading {fpath}: {e}")
-        
-        # Calculate ratio (%)
-        total_monthly_logs = TOTAL_LOGS_BY_MONTH.get(int(m_str), 1000000)
-        percentage = (month_errors / total_monthly_logs) * 100
-        
-        monthly_stats.append({
-            "month": int(m_str),
-            "errors": month_errors,
-            "unique_types": len(month_type_counts),
-            "percentage": round(percentage, 4),
-            "top_types": sorted(month_type_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        })
-
-    # Global Top Types for Pie Chart
-    sorted_global_types = sorted(global_type_counts.items(), key=lambda x: x[1], reverse=True)
-    top_5_global = sorted_global_types[:5]
-    
-    result = {
-        "generated_at": datetime.now().isoformat(),
-        "total_errors": total_errors,
-        "global_type_counts": global_type_counts,
-        "top_5_global": [t[0] for t in top_5_global],
-        "top_5_counts": [t[1] for t in top_5_global],
-        "top_types_summary": sorted_global_types, # Added for forecasting engine
-        "monthly": monthly_stats
-    }
-    
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=4, ensure_ascii=False)
-        
-    print(f"\n12-Month Analysis Complete!")
-    print(f"Total Errors Found: {total_errors}")
-    print(f"Stats saved to {OUTPUT_FILE}")
-
-if __name__ == "__main__":
-    rebuild_stats()
+import os
+import json
+import argparse
+from datetime import datetime
+
+from scan_engine import (
+    TARGET_MONTHS, scan_tree, scan_tree_incremental, load_manifest, save_manifest, default_workers
+)
+from event_store import scan_store
+from forecast_index import ForecastIndex, index_from_store
+from template_miner import consolidate
+from sketches import TypeSketch
+
+# Root directory for syslog data
+ROOT_DIR = "c:/syslog/syslog1년치"
+OUTPUT_FILE = "c:/syslog/stats.json"
+# Per-file offsets/partial counts for --incremental runs
+MANIFEST_FILE = "c:/syslog/stats_manifest.json"
+# Per-type event times for the forecast API, built in the same pass
+FORECAST_INDEX_FILE = "c:/syslog/forecast_index.npz"
+
+# Message templates listed in stats.json (all of them are counted)
+TOP_TEMPLATES = 50
+# --approx: types listed in global_type_counts/top_types_summary (exact mode lists every type)
+APPROX_TOP_TYPES = 200
+
+def build_stats(month_partials, months=TARGET_MONTHS, sketches=None):
+    """Builds the stats.json structure from merged per-month partials.
+
+    Partials carrying a "type_sketch" (rebuild_stats --approx) are counted
+    from the sketches: per-type numbers are then estimates, only the top
+    APPROX_TOP_TYPES types are listed and unique_types is estimated. If
+    sketches is a dict it receives the month and global TypeSketches as
+    JSON-ready dicts.
+    """
+    approx = any(part.get("type_sketch") is not None for part in month_partials.values())
+    global_sketch = TypeSketch() if approx else None
+    global_type_counts = {}
+    monthly_stats = []
+    total_errors = 0
+    total_lines = 0
+
+    # Templates mined per file are merged into one template set; each month keeps its share
+    present = [m_str for m_str in months if m_str in month_partials]
+    global_templates, month_templates = consolidate(
+        [month_partials[m_str].get("template_counts", {}) for m_str in present])
+    month_templates = dict(zip(present, month_templates))
+
+    for m_str in months:
+        part = month_partials.get(m_str)
+        if part is None:
+            # Even if directory missing, add placeholder to keep index stable
+            monthly_stats.append({"month": int(m_str), "errors": 0, "lines": 0, "unique_types": 0, "percentage": 0,
+                                  "top_types": [], "top_templates": [], "daily_lines": {}})
+            continue
+
+        month_errors = part["errors"]
+        month_type_counts = part["type_counts"]
+        unique_types = len(month_type_counts)
+        if approx:
+            # Exact counts (if any) are folded into the month's sketch
+            sketch = TypeSketch.load(part.get("type_sketch")).merge(TypeSketch.from_counts(month_type_counts))
+            global_sketch.merge(sketch)
+            month_type_counts = dict(sketch.top(5))
+            unique_types = sketch.distinct()
+            if sketches is not None:
+                sketches.setdefault("months", {})[m_str] = sketch.to_dict()
+        for t_name, t_count in month_type_counts.items():
+            global_type_counts[t_name] = global_type_counts.get(t_name, 0) + t_count
+        total_errors += month_errors
+
+        # Calculate ratio (%) against the exact line count from the same scan
+        month_lines = part.get("lines", 0)
+        total_lines += month_lines
+        percentage = (month_errors / month_lines) * 100 if month_lines else 0
+
+        monthly_stats.append({
+            "month": int(m_str),
+            "errors": month_errors,
+            "lines": month_lines,
+            "unique_types": unique_types,
+            "percentage": round(percentage, 4),
+            "top_types": sorted(month_type_counts.items(), key=lambda x: x[1], reverse=True)[:5],
+            "top_templates": sorted(month_templates[m_str].items(), key=lambda x: x[1], reverse=True)[:5],
+            "daily_lines": dict(sorted(part.get("day_lines", {}).items()))
+        })
+
+    if approx:
+        # Global heavy hitters come from the merged sketch, not from the per-month top 5s
+        global_type_counts = dict(global_sketch.top(APPROX_TOP_TYPES))
+        if sketches is not None:
+            sketches["global"] = global_sketch.to_dict()
+
+    # Global Top Types for Pie Chart
+    sorted_global_types = sorted(global_type_counts.items(), key=lambda x: x[1], reverse=True)
+    top_5_global = sorted_global_types[:5]
+
+    result = {
+        "generated_at": datetime.now().isoformat(),
+        "total_errors": total_errors,
+        "total_lines": total_lines,
+        "global_type_counts": global_type_counts,
+        "top_5_global": [t[0] for t in top_5_global],
+        "top_5_counts": [t[1] for t in top_5_global],
+        "top_types_summary": sorted_global_types, # Added for forecasting engine
+        "unique_templates": len(global_templates),
+        "top_templates": sorted(global_templates.items(), key=lambda x: x[1], reverse=True)[:TOP_TEMPLATES],
+        "monthly": monthly_stats
+    }
+    if approx:
+        result["approximate_types"] = True
+        result["unique_types"] = global_sketch.distinct()
+    return result
+
+def _load_forecast_index(path):
+    if os.path.exists(path):
+        try:
+            return ForecastIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring forecast index {path}: {e}")
+    return None
+
+
+def sketch_file_for(output_file):
+    # stats.json -> stats.sketch.json, next to it
+    base, ext = os.path.splitext(output_file)
+    return f"{base}.sketch{ext or '.json'}"
+
+
+def rebuild_stats(root_dir=ROOT_DIR, output_file=OUTPUT_FILE, workers=None,
+                  incremental=False, manifest_file=MANIFEST_FILE, store_dir=None,
+                  forecast_index_file=FORECAST_INDEX_FILE, approx=False):
+    workers = workers or default_workers()
+    print(f"Starting 12-month analysis for: {TARGET_MONTHS} ({workers} workers)")
+    if approx and forecast_index_file:
+        # The index keeps every type's event times, which grows with type cardinality
+        print("--approx: not building the forecast index (it is not fixed-memory).")
+        forecast_index_file = ''
+
+    events = {} if forecast_index_file else None
+    if store_dir:
+        # Counts come straight from the type column of the event store
+        month_partials, missing = scan_store(store_dir, TARGET_MONTHS)
+        if forecast_index_file:
+            forecast_index = index_from_store(store_dir, TARGET_MONTHS)
+    elif incremental:
+        # Only new files and appended tails are read; totals come from the manifest
+        manifest = load_manifest(manifest_file)
+        old_index = _load_forecast_index(forecast_index_file) if forecast_index_file else None
+        # Files the index has no events for yet (new index, or built from another source) are read in full
+        rescan = set()
+        if forecast_index_file:
+            rescan = set(manifest["files"]) - set(old_index.files if old_index is not None else [])
+        month_partials, missing, scanned = scan_tree_incremental(root_dir, manifest, TARGET_MONTHS, workers=workers,
+                                                                 events=events, rescan=rescan, approx=approx)
+        save_manifest(manifest_file, manifest)
+        print(f" Incremental scan: {scanned} of {len(manifest['files'])} files changed.")
+        if forecast_index_file:
+            if old_index is None:
+                forecast_index = ForecastIndex.build(list(manifest["files"]),
+                                                     {key: ev for key, (_, ev) in events.items()})
+            else:
+                forecast_index = old_index.updated(list(manifest["files"]), events)
+    else:
+        month_partials, missing = scan_tree(root_dir, TARGET_MONTHS, workers=workers, events=events, approx=approx)
+        if forecast_index_file:
+            forecast_index = ForecastIndex.build(list(events), events)
+    for m_str in missing:
+        print(f"Skipping {m_str}: Directory not found.")
+
+    if forecast_index_file:
+        forecast_index.save(forecast_index_file)
+        print(f"Forecast index: {len(forecast_index.types)} types, {len(forecast_index.ts)} events -> {forecast_index_file}")
+
+    sketches = {} if approx else None
+    result = build_stats(month_partials, TARGET_MONTHS, sketches)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=4, ensure_ascii=False)
+    if sketches:
+        # Mergeable month/global sketches, so other runs can combine them without rescanning
+        with open(sketch_file_for(output_file), 'w', encoding='utf-8') as f:
+            json.dump(sketches, f, ensure_ascii=False)
+        
+    print(f"\n12-Month Analysis Complete!")
+    print(f"Total Errors Found: {result['total_errors']} of {result['total_lines']} lines")
+    print(f"Stats saved to {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stats.json from the syslog month/file tree.")
+    parser.add_argument("--root", default=ROOT_DIR, help="syslog root directory (MM/*.txt)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="stats.json output path")
+    parser.add_argument("--workers", type=int, default=None, help="scan processes (default: CPU count)")
+    parser.add_argument("--incremental", action="store_true", help="only scan files changed since the last run")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="checkpoint manifest for --incremental")
+    parser.add_argument("--from-store", dest="store", default=None, help="read counts from an ingested event store directory")
+    parser.add_argument("--forecast-index", default=FORECAST_INDEX_FILE,
+                        help="forecast index output path ('' to skip; never built with --approx)")
+    parser.add_argument("--approx", action="store_true",
+                        help="count types with fixed-size sketches (bounded memory for unbounded type cardinality); "
+                             "skips the forecast index")
+    args = parser.parse_args()
+    rebuild_stats(args.root, args.output, args.workers, args.incremental, args.manifest, args.store,
+                  args.forecast_index, args.approx)
@@ -0,0 +1,662 @@
+import os
+import bz2
+import glob
+import gzip
+import json
+import mmap
+import zlib
+import re
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from template_miner import mine_messages
+from sketches import TypeSketch, sketch_json_default
+from metrics import METRICS_ENABLED, counter, histogram, timed
+
+try:
+    import zstandard
+except ImportError: # Optional: only needed for .zst archives
+    zstandard = None
+
+# Syslog TSV column layout (0-based)
+SEVERITY_COL = 2
+DATE_COL = 5
+TYPE_COL = 7
+MESSAGE_COL = 8
+# Severity keyword of error lines, matched as the whole column (not "error", "terr", ...)
+# in any case ("err", "ERR", "Err")
+ERROR_SEVERITY = "err"
+# Case-insensitive search for the tab-delimited field; about as fast as bytes.find here
+_SEVERITY_FIELD = re.compile(re.escape(b'\t' + ERROR_SEVERITY.encode() + b'\t'), re.IGNORECASE)
+
+# Target months: 1 to 12
+TARGET_MONTHS = [f"{m:02d}" for m in range(1, 13)]
+
+# Files are read in blocks cut on line boundaries. 1MB keeps the per-block
+# buffers inside the allocator's reuse range instead of fresh mmaps.
+BLOCK_SIZE = 1 << 20
+ROW_COLUMNS = ["severity", "date", "type", "message"]
+
+# Plain and compressed log files; compressed ones are decompressed on the fly
+LOG_PATTERNS = ["*.txt", "*.gz", "*.zst", "*.bz2"]
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".bz2")
+# Raw read size for .zst files (they shrink ~10x, so read big)
+COMPRESSED_READ_SIZE = 4 << 20
+# Decompressed blocks buffered ahead of the parser
+PREFETCH_BLOCKS = 4
+
+MANIFEST_VERSION = 4
+
+# Lines/sec is rate(syslog_lines_scanned_total); pool workers keep their own (unexported) copies
+LINES_SCANNED = counter("syslog_lines_scanned_total", "Syslog lines read", ("source",))
+BYTES_SCANNED = counter("syslog_bytes_scanned_total", "Syslog bytes read (decompressed)", ("source",))
+ERRORS_MATCHED = counter("syslog_errors_matched_total", "Error lines matched", ("source",))
+SCAN_SECONDS = histogram("syslog_scan_seconds", "Time to scan one log file", ("source",),
+                         buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+# Leading bytes hashed to detect a file that was replaced rather than appended to
+HEAD_BYTES = 4096
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def new_partial():
+    # Partial counters produced per file and merged per month; "lines" counts every line, not just errors
+    return {"errors": 0, "lines": 0, "day_lines": {}, "type_counts": {}, "template_counts": {}}
+
+
+def merge_partial(dst, src):
+    dst["errors"] += src["errors"]
+    dst["lines"] = dst.get("lines", 0) + src.get("lines", 0)
+    for key in ("day_lines", "type_counts", "template_counts"):
+        dst_counts = dst.setdefault(key, {})
+        for name, count in src.get(key, {}).items():
+            dst_counts[name] = dst_counts.get(name, 0) + count
+    # Approximate mode: fixed-size type sketches instead of exact type_counts
+    if src.get("type_sketch") is not None:
+        dst["type_sketch"] = TypeSketch.load(dst.get("type_sketch")).merge(TypeSketch.load(src["type_sketch"]))
+    return dst
+
+
+def list_month_files(root_dir, months=TARGET_MONTHS):
+    """Returns ({month: [files]}, [missing months]) in a stable order."""
+    month_files = {}
+    missing = []
+    for m_str in months:
+        month_path = os.path.join(root_dir, m_str)
+        if not os.path.exists(month_path):
+            missing.append(m_str)
+            continue
+        month_files[m_str] = month_log_files(month_path)
+    return month_files, missing
+
+
+def month_log_files(month_path):
+    """Sorted plain and compressed log files of one month directory."""
+    files = set()
+    for pattern in LOG_PATTERNS:
+        files.update(glob.glob(os.path.join(month_path, pattern)))
+    return sorted(files)
+
+
+def is_compressed(fpath):
+    return fpath.endswith(COMPRESSED_SUFFIXES)
+
+
+def open_log(fpath):
+    """Opens a log file for binary reading, decompressing .gz/.zst/.bz2 transparently."""
+    # gzip/bz2 are given the path: they never close a file object passed in
+    if fpath.endswith(".gz"):
+        return gzip.open(fpath)
+    if fpath.endswith(".bz2"):
+        return bz2.open(fpath)
+    if fpath.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(fpath, 'rb'), read_size=COMPRESSED_READ_SIZE,
+                                                           read_across_frames=True, closefd=True)
+    return open(fpath, 'rb')
+
+
+def _prefetch(blocks, depth=PREFETCH_BLOCKS):
+    """Iterates blocks produced by a background thread.
+
+    zlib/bz2/zstd release the GIL while decompressing, so the next blocks
+    are decompressed while the current one is being parsed.
+    """
+    q = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Gives up once the consumer has stopped, so the join below never waits on a full queue
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for block in blocks:
+                if not put(block):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def read_blocks(f, fpath, complete_lines_only=False):
+    """iter_blocks() for a file opened with open_log(); compressed input is prefetched."""
+    blocks = iter_blocks(f, complete_lines_only=complete_lines_only)
+    return _prefetch(blocks) if is_compressed(fpath) else blocks
+
+
+def iter_blocks(f, block_size=BLOCK_SIZE, complete_lines_only=False):
+    """Yields blocks of whole lines from a binary file object.
+
+    A trailing line without a newline is yielded last unless
+    complete_lines_only is set.
+    """
+    rest = b''
+    while True:
+        chunk = f.read(block_size)
+        if not chunk:
+            break
+        buf = rest + chunk if rest else chunk
+        cut = buf.rfind(b'\n') + 1
+        if cut == 0:
+            rest = buf
+            continue
+        rest = buf[cut:]
+        yield buf[:cut]
+    if rest and not complete_lines_only:
+        yield rest
+
+
+def _candidate_lines(buf, start=0, end=None):
+    """Raw lines of buf[start:end] whose severity column is ERROR_SEVERITY (any case).
+
+    buf is bytes or an mmap; the tab-delimited field is searched in place and
+    only matching lines are copied out. start must be at a line start.
+    """
+    if end is None:
+        end = len(buf)
+    search = _SEVERITY_FIELD.search
+    find = buf.find
+    rfind = buf.rfind
+
+    def find_field(pos):
+        m = search(buf, pos, end)
+        return -1 if m is None else m.start()
+
+    lines = []
+    pos = find_field(start)
+    while pos != -1:
+        nl = rfind(b'\n', start, pos)
+        line_start = start if nl == -1 else nl + 1
+        tabs = buf[line_start:pos].count(b'\t')
+        if tabs < SEVERITY_COL - 1:
+            # Matched an earlier column; the severity column may still follow on this line
+            pos = find_field(pos + 1)
+            continue
+        line_end = find(b'\n', pos, end)
+        if line_end == -1:
+            line_end = end
+        if tabs == SEVERITY_COL - 1:
+            lines.append(buf[line_start:line_end])
+        pos = find_field(line_end)
+    return lines
+
+
+def _count_newlines(buf, start, end, chunk=256 << 10):
+    # NumPy view over the buffer: no copy, ~3x faster than slicing + bytes.count;
+    # cache-sized chunks keep the temporary comparison array hot
+    view = np.frombuffer(buf, dtype=np.uint8, count=end - start, offset=start)
+    n = 0
+    for pos in range(0, len(view), chunk):
+        n += int(np.count_nonzero(view[pos:pos + chunk] == 10))
+    del view # must not outlive the mmap
+    return n
+
+
+def _line_day(buf, pos, end):
+    # "YYYY-MM-DD" from the date column of the line starting at pos, or None
+    line_end = buf.find(b'\n', pos, end)
+    fields = buf[pos:end if line_end == -1 else line_end].split(b'\t', DATE_COL + 1)
+    if len(fields) <= DATE_COL:
+        return None
+    day = fields[DATE_COL].strip()[:10]
+    if len(day) != 10 or day[4:5] != b'-' or day[7:8] != b'-' or not day[:4].isdigit():
+        return None
+    return day.decode('ascii')
+
+
+_DATE_DIGITS = np.array([0, 1, 2, 3, 5, 6, 8, 9])
+
+
+def _count_days(buf, start, end, day_lines, chunk=1 << 20):
+    # Exact per-line date counts in NumPy, one newline-aligned chunk at a time: the date
+    # column starts after the (DATE_COL)th tab of each line. Lines whose column is not
+    # plain "YYYY-MM-DD..." go through _line_day one by one.
+    total = 0
+    pos = start
+    while pos < end:
+        stop = end
+        if pos + chunk < end:
+            nl = buf.find(b'\n', pos + chunk, end)
+            stop = end if nl == -1 else nl + 1
+        view = np.frombuffer(buf, dtype=np.uint8, count=stop - pos, offset=pos)
+        # One pass for tabs and newlines (and the rare other control bytes below \n)
+        marks = np.flatnonzero(view <= 10)
+        kinds = view[marks]
+        newlines = marks[kinds == 10]
+        starts = np.concatenate(([0], newlines + 1))
+        if starts[-1] == len(view):
+            starts = starts[:-1] # no trailing partial line
+        ends = np.append(newlines, len(view))[:len(starts)]
+        total += len(starts)
+
+        tabs = marks[kinds == 9]
+        k = np.searchsorted(tabs, starts) + (DATE_COL - 1)
+        fast = k < len(tabs)
+        col = tabs[np.minimum(k, len(tabs) - 1)] + 1 if len(tabs) else np.zeros(len(starts), dtype=np.int64)
+        fast &= col + 10 <= ends
+        rows = np.flatnonzero(fast)
+        date = view[col[rows, None] + np.arange(10)].astype(np.int32) - 48 # ASCII digits -> 0..9
+        ok = (date[:, 4] == -3) & (date[:, 7] == -3) & ((date[:, _DATE_DIGITS] >= 0) & (date[:, _DATE_DIGITS] <= 9)).all(axis=1)
+        d = date[ok]
+        ymd = (((d[:, 0] * 10 + d[:, 1]) * 10 + d[:, 2]) * 10 + d[:, 3]) * 10000 \
+            + (d[:, 5] * 10 + d[:, 6]) * 100 + d[:, 8] * 10 + d[:, 9]
+        for value, n in zip(*np.unique(ymd, return_counts=True)):
+            day = f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+            day_lines[day] = day_lines.get(day, 0) + int(n)
+        fast[rows[~ok]] = False
+        slow = np.flatnonzero(~fast)
+        del view, kinds, date # must not outlive the mmap
+        for i in slow.tolist():
+            day = _line_day(buf, pos + int(starts[i]), stop)
+            if day is not None:
+                day_lines[day] = day_lines.get(day, 0) + 1
+        pos = stop
+    return total
+
+
+def _count_lines(buf, start, end, day_lines=None):
+    """Number of lines in buf[start:end] (a trailing line without newline included).
+
+    With day_lines, every line is also added to day_lines[date] by its date
+    column, whatever the order of the lines. Lines without a parseable date
+    only count in the total, so day_lines may sum to less than it.
+    """
+    if end <= start:
+        return 0
+    if day_lines is None:
+        return _count_newlines(buf, start, end) + (buf[end - 1:end] != b'\n')
+    return _count_days(buf, start, end, day_lines)
+
+
+def _scan_blocks(fpath, start, complete_lines_only, max_lines, count_lines, day_lines):
+    # Streaming path for compressed files, which cannot be memory-mapped
+    lines = []
+    offset = start
+    n_lines = 0
+    with open_log(fpath) as f:
+        if start:
+            f.seek(start)
+        for block in read_blocks(f, fpath, complete_lines_only):
+            if max_lines is not None:
+                cut = 0
+                for _ in range(max_lines):
+                    cut = block.find(b'\n', cut) + 1
+                    if cut == 0:
+                        cut = len(block)
+                        break
+                max_lines -= block.count(b'\n', 0, cut)
+                block = block[:cut]
+            offset += len(block)
+            lines.extend(_candidate_lines(block))
+            if count_lines:
+                n_lines += _count_lines(block, 0, len(block), day_lines)
+            if max_lines is not None and max_lines <= 0:
+                break
+    return lines, offset, n_lines
+
+
+def scan_candidates(fpath, start=0, complete_lines_only=False, max_lines=None, count_lines=False, day_lines=None):
+    """Returns (candidate lines, end offset, line count) for fpath from byte offset start.
+
+    Plain files are memory-mapped and searched in place, so non-error lines
+    are never copied, decoded or split. With complete_lines_only a trailing
+    line without a newline is left out; max_lines stops after that many
+    lines. Lines are only counted with count_lines or day_lines (0
+    otherwise); day_lines additionally gets per-date counts (see _count_lines).
+    """
+    count_lines = count_lines or day_lines is not None
+    if is_compressed(fpath):
+        return _scan_blocks(fpath, start, complete_lines_only, max_lines, count_lines, day_lines)
+    with open(fpath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return [], start, 0
+        # The mapping has the size at open time; lines appended later are left for the next scan
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            if max_lines is not None:
+                pos = start
+                for _ in range(max_lines):
+                    nl = mm.find(b'\n', pos, end)
+                    if nl == -1:
+                        pos = end
+                        break
+                    pos = nl + 1
+                end = pos
+            if complete_lines_only:
+                nl = mm.rfind(b'\n', start, end)
+                end = start if nl == -1 else nl + 1
+            n_lines = _count_lines(mm, start, end, day_lines) if count_lines else 0
+            return _candidate_lines(mm, start, end), end, n_lines
+
+
+def rows_from_lines(lines):
+    """Returns a DataFrame (ROW_COLUMNS) of the error lines among raw candidate lines."""
+    # pandas is imported on first use: the web server only needs it for the raw-file fallback
+    import pandas as pd
+    if not lines:
+        return pd.DataFrame(columns=ROW_COLUMNS)
+    text = pd.Series(b'\n'.join(lines).decode('utf-8', errors='ignore').split('\n'))
+    fields = text.str.split('\t', n=MESSAGE_COL + 1, expand=True)
+    if fields.shape[1] <= MESSAGE_COL:
+        return pd.DataFrame(columns=ROW_COLUMNS)
+    # Rule: 3rd column (index 2) is ERROR_SEVERITY in any case and the line has at least 9 columns
+    mask = fields[MESSAGE_COL].notna() & (fields[SEVERITY_COL].str.lower() == ERROR_SEVERITY)
+    fields = fields[mask.fillna(False).astype(bool)]
+    return pd.DataFrame({
+        "severity": fields[SEVERITY_COL],
+        "date": fields[DATE_COL],
+        "type": fields[TYPE_COL],
+        "message": fields[MESSAGE_COL].str.rstrip('\r'),
+    }).reset_index(drop=True)
+
+
+def parse_error_rows(block):
+    """Returns a DataFrame (ROW_COLUMNS) of the error lines in a block of raw bytes."""
+    return rows_from_lines(_candidate_lines(block))
+
+
+def count_types(rows, type_counts=None):
+    """Adds per-type counts of rows into type_counts, keeping first-seen order."""
+    if type_counts is None:
+        type_counts = {}
+    if len(rows):
+        sizes = rows.groupby("type", sort=False).size()
+        for t_name, t_count in zip(sizes.index, sizes.tolist()):
+            type_counts[t_name] = type_counts.get(t_name, 0) + t_count
+    return type_counts
+
+
+def read_error_rows(fpath, max_lines=None):
+    """Returns the error rows of one file, optionally only from its first max_lines lines."""
+    with timed(SCAN_SECONDS, ("file",)):
+        lines, end, n_lines = scan_candidates(fpath, max_lines=max_lines, count_lines=METRICS_ENABLED)
+    # Candidates are rare, so the vectorized pass runs once per file rather than per block
+    rows = rows_from_lines(lines)
+    _count_scanned(n_lines, end, len(rows))
+    return rows
+
+
+def _count_scanned(n_lines, n_bytes, n_errors):
+    LINES_SCANNED.inc(n_lines, ("file",))
+    BYTES_SCANNED.inc(n_bytes, ("file",))
+    ERRORS_MATCHED.inc(n_errors, ("file",))
+
+
+def parse_timestamps(date_strs):
+    """Parses "YYYY-MM-DD HH:MM:SS" strings to datetime64[s]; malformed dates become NaT."""
+    try:
+        return np.array(date_strs, dtype='datetime64[s]')
+    except ValueError:
+        # Slow path only for files containing malformed dates
+        out = np.empty(len(date_strs), dtype='datetime64[s]')
+        for i, s in enumerate(date_strs):
+            try:
+                out[i] = np.datetime64(s, 's')
+            except ValueError:
+                out[i] = np.datetime64('NaT')
+        return out
+
+
+def row_events(rows):
+    """Returns {"types", "codes", "ts"} for error rows: per-event type codes and int64 epoch seconds.
+
+    Rows without a parseable date are left out; they still count in the
+    partial, they just cannot be placed in time.
+    """
+    import pandas as pd
+    ts = parse_timestamps(rows["date"].str.strip().tolist()) if len(rows) else np.empty(0, dtype='datetime64[s]')
+    valid = ~np.isnat(ts)
+    codes, types = pd.factorize(rows["type"][valid]) if len(rows) else (np.empty(0, dtype=np.int64), [])
+    return {"types": list(types), "codes": codes.astype(np.int32), "ts": ts[valid].astype(np.int64)}
+
+
+def scan_file(fpath, start=0, complete_lines_only=False, with_events=False, approx=False):
+    """Counts error lines in fpath from byte offset start.
+
+    The returned partial carries "offset", the byte position scanning
+    stopped at. With complete_lines_only a trailing line without a newline
+    is left for the next run, so an incremental rescan never counts half a
+    line that is still being written. "lines" and "day_lines" count every
+    line read, not just errors. with_events adds "events" (see row_events)
+    for the forecast index. With approx, per-type counts are returned as a
+    fixed-size "type_sketch" (sketches.TypeSketch) instead of "type_counts".
+    """
+    part = new_partial()
+    with timed(SCAN_SECONDS, ("file",)):
+        # Total lines (the error ratio denominator) are counted over the same mapped bytes
+        lines, offset, part["lines"] = scan_candidates(fpath, start, complete_lines_only, day_lines=part["day_lines"])
+    rows = rows_from_lines(lines)
+    _count_scanned(part["lines"], offset - start, len(rows))
+    count_types(rows, part["type_counts"])
+    if approx:
+        part["type_sketch"] = TypeSketch.from_counts(part["type_counts"])
+        part["type_counts"] = {}
+    part["template_counts"] = mine_messages(rows["message"].tolist())
+    part["errors"] = len(rows)
+    part["offset"] = offset
+    if with_events:
+        part["events"] = row_events(rows)
+    return part
+
+
+def _scan_task(task):
+    # Runs inside a worker process; errors are reported back instead of raised
+    fpath, start, complete_lines_only, with_events, approx = task
+    try:
+        return scan_file(fpath, start, complete_lines_only, with_events, approx), None
+    except Exception as e:
+        return None, str(e)
+
+
+def run_tasks(fn, tasks, workers):
+    """Runs fn over tasks and returns results in task order.
+
+    Tasks are submitted largest file first so one big file does not end up
+    last on a single worker, but results are always handed back in the
+    original order so merging stays deterministic.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        return [fn(t) for t in tasks]
+
+    def _size(t):
+        fpath = t if isinstance(t, str) else t[0]
+        try:
+            # Rough work estimate: compressed logs expand about 10x
+            return os.path.getsize(fpath) * (10 if is_compressed(fpath) else 1)
+        except OSError:
+            return 0
+
+    order = sorted(range(len(tasks)), key=lambda i: _size(tasks[i]), reverse=True)
+    results = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {i: ex.submit(fn, tasks[i]) for i in order}
+        for i, fut in futures.items():
+            results[i] = fut.result()
+    return results
+
+
+def scan_tree(root_dir, months=TARGET_MONTHS, workers=None, events=None, approx=False):
+    """Scans root_dir/MM/*.txt across a process pool.
+
+    Returns ({month: partial}, [missing months]). Partials are merged in
+    month/file order, so the output is identical to a serial scan
+    regardless of the worker count. If events is a dict, it is filled
+    with {relative path: row_events(...)} for every file scanned. approx
+    is passed on to scan_file.
+    """
+    workers = workers or default_workers()
+    month_files, missing = list_month_files(root_dir, months)
+
+    tasks = []
+    for m_str in months:
+        for fpath in month_files.get(m_str, []):
+            tasks.append((m_str, fpath))
+
+    with_events = events is not None
+    results = run_tasks(_scan_task, [(fpath, 0, False, with_events, approx) for _, fpath in tasks], workers)
+
+    month_partials = {m_str: new_partial() for m_str in month_files}
+    for (m_str, fpath), (part, err) in zip(tasks, results):
+        if err is not None:
+            print(f" Error reading {fpath}: {err}")
+            continue
+        if with_events:
+            events[os.path.relpath(fpath, root_dir)] = part.pop("events")
+        merge_partial(month_partials[m_str], part)
+    return month_partials, missing
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        print(f"Ignoring manifest {path}: unsupported version.")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(path, manifest):
+    # Write to a temp file first so an interrupted run never leaves a torn manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, default=sketch_json_default)
+    os.replace(tmp_path, path)
+
+
+def _head_crc(fpath, length):
+    with open(fpath, 'rb') as f:
+        return zlib.crc32(f.read(length))
+
+
+def _plan_file(fpath, entry):
+    """Returns the byte offset to resume fpath from, or None if unchanged."""
+    st = os.stat(fpath)
+    if entry is None:
+        return 0
+    if is_compressed(fpath):
+        # Archives are immutable: unchanged or read again in full, never resumed mid-stream
+        return None if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"] else 0
+    if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"] and entry["offset"] == st.st_size:
+        return None
+    if st.st_size < entry["offset"]:
+        return 0 # Truncated or rotated
+    if _head_crc(fpath, entry["head_len"]) != entry["head_crc"]:
+        return 0 # Same name, different content
+    return entry["offset"]
+
+
+def scan_tree_incremental(root_dir, manifest, months=TARGET_MONTHS, workers=None, events=None, rescan=(),
+                          approx=False):
+    """Scans only new files and the appended tail of growing ones.
+
+    Per-file offsets and partial counts are kept in manifest["files"], which
+    is updated in place. Returns ({month: partial}, [missing months],
+    number of files scanned), where the partials are rebuilt from every
+    manifest entry in month/file order just like scan_tree.
+
+    If events is a dict, it is filled with {relative path: (start offset,
+    row_events(...))} for every file scanned. Files in rescan are read
+    from the beginning even if unchanged. Switching approx on or off
+    rescans everything, since entries hold either exact counts or sketches.
+    """
+    workers = workers or default_workers()
+    month_files, missing = list_month_files(root_dir, months)
+    old_files = manifest["files"] if manifest.get("approx", False) == approx else {}
+    manifest["approx"] = approx
+    new_files = {}
+
+    tasks = []
+    for m_str in months:
+        for fpath in month_files.get(m_str, []):
+            key = os.path.relpath(fpath, root_dir)
+            entry = old_files.get(key)
+            try:
+                start = 0 if key in rescan else _plan_file(fpath, entry)
+            except OSError as e:
+                print(f" Error reading {fpath}: {e}")
+                continue
+            if start is None:
+                new_files[key] = entry
+                continue
+            if start == 0:
+                entry = {"month": m_str, "offset": 0, **new_partial()}
+            new_files[key] = entry
+            tasks.append((key, fpath, start))
+
+    with_events = events is not None
+    results = run_tasks(_scan_task, [(fpath, start, not is_compressed(fpath), with_events, approx)
+                                     for _, fpath, start in tasks], workers)
+
+    for (key, fpath, start), (part, err) in zip(tasks, results):
+        entry = new_files[key]
+        if err is not None:
+            print(f" Error reading {fpath}: {err}")
+            if start == 0:
+                del new_files[key]
+            continue
+        if with_events:
+            events[key] = (start, part.pop("events"))
+        merge_partial(entry, part)
+        st = os.stat(fpath)
+        entry["offset"] = part["offset"]
+        entry["size"] = st.st_size
+        entry["mtime"] = st.st_mtime_ns
+        entry["head_len"] = min(HEAD_BYTES, part["offset"])
+        entry["head_crc"] = _head_crc(fpath, entry["head_len"])
+
+    manifest["files"] = new_files
+
+    month_partials = {m_str: new_partial() for m_str in month_files}
+    for key, entry in new_files.items():
+        merge_partial(month_partials[entry["month"]], entry)
+    return month_partials, missing, len(tasks)
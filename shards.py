@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import argparse
+from datetime import datetime
+
+from scan_engine import (
+    TARGET_MONTHS, new_partial, merge_partial, scan_tree, scan_tree_incremental, load_manifest, save_manifest,
+    default_workers
+)
+from event_store import scan_store
+from rebuild_stats import build_stats
+from sketches import sketch_json_default
+
+# One shard per source (router, collector node, ...): <SHARD_DIR>/<source>.json
+#   {"version", "source", "generated_at", "approx", "months": {MM: partial}}
+# Partials are the merge_partial format, so shards merge exactly like files and months do.
+SHARD_DIR = os.environ.get("SHARD_DIR", "shards")
+SHARD_VERSION = 1
+SHARD_SUFFIX = ".json"
+# Source names become file names
+SOURCE_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+# Partial keys kept in a shard (offsets and events stay on the collector)
+SHARD_PARTIAL_KEYS = ("errors", "lines", "day_lines", "type_counts", "template_counts", "type_sketch")
+
+
+def check_source(source):
+    if not SOURCE_PATTERN.match(source or ""):
+        raise ValueError(f"Invalid source name {source!r} (letters, digits, '.', '_' and '-')")
+    return source
+
+
+def shard_path(shard_dir, source):
+    return os.path.join(shard_dir, check_source(source) + SHARD_SUFFIX)
+
+
+def _shard_partial(part):
+    return {key: part[key] for key in SHARD_PARTIAL_KEYS if part.get(key) is not None}
+
+
+def build_shard(root_dir, source, shard_dir=SHARD_DIR, workers=None, incremental=False, manifest_file=None,
+                store_dir=None, approx=False):
+    """Scans one source's MM/*.txt tree (or event store) and writes its shard.
+
+    Runs on the collector that holds the logs; only the shard file (counts,
+    no log lines) has to be shipped to the node that merges. Returns the
+    shard path.
+    """
+    check_source(source)
+    workers = workers or default_workers()
+    if store_dir:
+        month_partials, _ = scan_store(store_dir, TARGET_MONTHS)
+    elif incremental:
+        manifest_file = manifest_file or os.path.join(root_dir, f".{source}.manifest.json")
+        manifest = load_manifest(manifest_file)
+        month_partials, _, scanned = scan_tree_incremental(root_dir, manifest, TARGET_MONTHS, workers=workers,
+                                                           approx=approx)
+        save_manifest(manifest_file, manifest)
+        print(f" Incremental scan: {scanned} of {len(manifest['files'])} files changed.")
+    else:
+        month_partials, _ = scan_tree(root_dir, TARGET_MONTHS, workers=workers, approx=approx)
+
+    shard = {
+        "version": SHARD_VERSION,
+        "source": source,
+        "generated_at": datetime.now().isoformat(),
+        "approx": approx,
+        "months": {m_str: _shard_partial(part) for m_str, part in month_partials.items()},
+    }
+    os.makedirs(shard_dir, exist_ok=True)
+    path = shard_path(shard_dir, source)
+    # Temp file + rename: a merger (or the web app) never reads a torn shard
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(shard, f, ensure_ascii=False, default=sketch_json_default)
+    os.replace(tmp_path, path)
+    errors = sum(part["errors"] for part in month_partials.values())
+    print(f"Shard {source}: {errors} errors in {len(month_partials)} months -> {path}")
+    return path
+
+
+def load_shard(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        shard = json.load(f)
+    if shard.get("version") != SHARD_VERSION:
+        raise ValueError(f"{path}: unsupported shard version {shard.get('version')}")
+    check_source(shard["source"])
+    return shard
+
+
+class ShardSet:
+    """All shards of a directory, merged on demand for any subset of sources."""
+
+    def __init__(self, shards):
+        self.shards = {shard["source"]: shard for shard in shards}
+
+    @classmethod
+    def load(cls, shard_dir):
+        # StatsCache loader: renaming a shard into the directory changes its mtime, which triggers a reload
+        shards = []
+        for name in sorted(os.listdir(shard_dir)):
+            if not name.endswith(SHARD_SUFFIX):
+                continue
+            try:
+                shards.append(load_shard(os.path.join(shard_dir, name)))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping shard {name}: {e}")
+        return cls(shards)
+
+    def sources(self):
+        """Per-source summary: generation time, approx flag, error and line totals."""
+        summary = []
+        for source, shard in sorted(self.shards.items()):
+            months = shard["months"].values()
+            summary.append({
+                "source": source,
+                "generated_at": shard["generated_at"],
+                "approx": shard.get("approx", False),
+                "errors": sum(part["errors"] for part in months),
+                "lines": sum(part.get("lines", 0) for part in months),
+            })
+        return summary
+
+    def unknown(self, sources):
+        return [s for s in sources if s not in self.shards]
+
+    def month_partials(self, sources=None):
+        """{month: partial} summed over the given sources (default: all), in source order."""
+        selected = sorted(self.shards) if sources is None else sorted(set(sources))
+        month_partials = {}
+        for source in selected:
+            for m_str, part in self.shards[source]["months"].items():
+                merge_partial(month_partials.setdefault(m_str, new_partial()), part)
+        return month_partials
+
+    def stats(self, sources=None):
+        """stats.json structure for the given sources (default: all) plus a "sources" list."""
+        result = build_stats(self.month_partials(sources), TARGET_MONTHS)
+        result["sources"] = sorted(self.shards) if sources is None else sorted(set(sources))
+        return result
+
+
+def merge_shards(shard_dir=SHARD_DIR, output_file=None, sources=None):
+    """Merges the shards of shard_dir (optionally only some sources) into a stats.json."""
+    shard_set = ShardSet.load(shard_dir)
+    if sources:
+        unknown = shard_set.unknown(sources)
+        if unknown:
+            raise ValueError(f"Unknown source(s): {', '.join(unknown)}")
+    if not shard_set.shards:
+        raise ValueError(f"No shards found in {shard_dir}")
+    result = shard_set.stats(sources or None)
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+        print(f"Merged {len(result['sources'])} shards: {result['total_errors']} errors of "
+              f"{result['total_lines']} lines -> {output_file}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-source stats shards: build one on a collector, merge many.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="scan this collector's logs into <shard-dir>/<source>.json")
+    build.add_argument("--source", required=True, help="source name (host or collector), used as the file name")
+    build.add_argument("--root", default=None, help="syslog root directory (MM/*.txt)")
+    build.add_argument("--shard-dir", default=SHARD_DIR)
+    build.add_argument("--workers", type=int, default=None, help="scan processes (default: CPU count)")
+    build.add_argument("--incremental", action="store_true", help="only scan files changed since the last build")
+    build.add_argument("--manifest", default=None, help="checkpoint manifest for --incremental "
+                                                        "(default: <root>/.<source>.manifest.json)")
+    build.add_argument("--from-store", dest="store", default=None, help="read counts from an event store directory")
+    build.add_argument("--approx", action="store_true", help="count types with fixed-size sketches")
+
+    merge = sub.add_parser("merge", help="merge shards into a stats.json")
+    merge.add_argument("--shard-dir", default=SHARD_DIR)
+    merge.add_argument("--output", required=True, help="stats.json output path")
+    merge.add_argument("--source", dest="sources", action="append", help="only these sources (repeatable)")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        if not args.root and not args.store:
+            parser.error("build needs --root or --from-store")
+        build_shard(args.root, args.source, args.shard_dir, args.workers, args.incremental, args.manifest,
+                    args.store, args.approx)
+    else:
+        merge_shards(args.shard_dir, args.output, args.sources)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import zlib
+import base64
+import hashlib
+
+import numpy as np
+
+# Fixed memory per sketch: monitored types in the Space-Saving summary and the Count-Min table shape
+SKETCH_CAPACITY = 1024
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+# 2**12 HyperLogLog registers: ~1.6% standard error on the number of distinct types
+HLL_PRECISION = 12
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary, fed with pre-aggregated (key, count) batches.
+
+    counts[key] overestimates the true count by at most errors[key], and any
+    key that is not monitored occurred at most `floor` times. Two summaries
+    merge by adding counts (a key missing on one side counts as that side's
+    floor) and keeping the `capacity` largest, so per-file summaries can be
+    merged across workers and months with the same guarantees.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    @classmethod
+    def from_counts(cls, counts, capacity=SKETCH_CAPACITY):
+        summary = cls(capacity)
+        summary.counts = dict(counts)
+        summary.errors = dict.fromkeys(summary.counts, 0)
+        summary._truncate()
+        return summary
+
+    def _truncate(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Stable sort: ties keep first-seen order, so merges are deterministic
+        ranked = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        self.counts = dict(ranked[:self.capacity])
+        self.errors = {key: self.errors[key] for key in self.counts}
+
+    def merge(self, other):
+        counts = {}
+        errors = {}
+        for key in list(self.counts) + [k for k in other.counts if k not in self.counts]:
+            counts[key] = self.counts.get(key, self.floor) + other.counts.get(key, other.floor)
+            errors[key] = self.errors.get(key, self.floor) + other.errors.get(key, other.floor)
+        self.counts = counts
+        self.errors = errors
+        self.floor += other.floor
+        self._truncate()
+        return self
+
+
+class CountMinSketch:
+    """Count-Min table; estimates never undercount and merge by adding tables.
+
+    Keys are hashed with blake2b rather than hash(), so cells agree across
+    worker processes and runs. Counts are uint32 to halve the size.
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, table=None):
+        self.table = np.zeros((depth, width), dtype=np.uint32) if table is None else table
+
+    def _cells(self, keys):
+        depth, width = self.table.shape
+        digest = b''.join(hashlib.blake2b(k.encode('utf-8'), digest_size=4 * depth).digest() for k in keys)
+        return np.frombuffer(digest, dtype='<u4').reshape(len(keys), depth) % width
+
+    def add_counts(self, counts):
+        if not counts:
+            return
+        cells = self._cells(list(counts))
+        values = np.fromiter(counts.values(), dtype=np.uint32, count=len(counts))
+        for row in range(self.table.shape[0]):
+            np.add.at(self.table[row], cells[:, row], values)
+
+    def estimate(self, keys):
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        cells = self._cells(keys)
+        rows = np.arange(self.table.shape[0])
+        return self.table[rows, cells].min(axis=1).astype(np.int64)
+
+    def merge(self, other):
+        if other.table.shape != self.table.shape:
+            raise ValueError("Count-Min sketches must have the same shape to merge")
+        self.table += other.table
+        return self
+
+
+class HyperLogLog:
+    """Distinct-count estimator; merges by taking the register-wise max."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, keys):
+        if not keys:
+            return
+        digest = b''.join(hashlib.blake2b(k.encode('utf-8'), digest_size=8).digest() for k in keys)
+        hashes = np.frombuffer(digest, dtype='<u8')
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Rank = position of the first 1 bit in the remaining bits (bits + 1 when they are all zero)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (bits + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros))) # small-range correction
+        return int(round(raw))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog sketches must have the same precision to merge")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+class TypeSketch:
+    """Bounded-memory per-type counts: Space-Saving top-k, each estimate tightened by a
+    Count-Min table, plus a HyperLogLog for the number of distinct types."""
+
+    def __init__(self, summary=None, cms=None, hll=None, total=0):
+        self.summary = summary if summary is not None else SpaceSaving()
+        self.cms = cms if cms is not None else CountMinSketch()
+        self.hll = hll if hll is not None else HyperLogLog()
+        self.total = total
+
+    @classmethod
+    def from_counts(cls, counts):
+        sketch = cls(SpaceSaving.from_counts(counts))
+        sketch.cms.add_counts(counts)
+        sketch.hll.add(list(counts))
+        sketch.total = sum(counts.values())
+        return sketch
+
+    @classmethod
+    def load(cls, value):
+        """A fresh TypeSketch from None, a to_dict() dict or another sketch (copied)."""
+        if value is None:
+            return cls()
+        if isinstance(value, TypeSketch):
+            return cls().merge(value)
+        return cls.from_dict(value)
+
+    def merge(self, other):
+        self.summary.merge(other.summary)
+        self.cms.merge(other.cms)
+        self.hll.merge(other.hll)
+        self.total += other.total
+        return self
+
+    def top(self, n):
+        """[(type, estimated count)] of the n heaviest types, largest first."""
+        keys = list(self.summary.counts)
+        estimates = np.minimum(np.fromiter(self.summary.counts.values(), dtype=np.int64, count=len(keys)),
+                               self.cms.estimate(keys))
+        ranked = sorted(zip(keys, estimates.tolist()), key=lambda x: x[1], reverse=True)
+        return ranked[:n]
+
+    def estimate(self, key):
+        return int(min(self.summary.counts.get(key, self.summary.floor), self.cms.estimate([key])[0]))
+
+    def distinct(self):
+        return max(self.hll.estimate(), len(self.summary.counts))
+
+    def to_dict(self):
+        depth, width = self.cms.table.shape
+        return {
+            "total": self.total,
+            "capacity": self.summary.capacity,
+            "floor": self.summary.floor,
+            "counts": [[k, c, self.summary.errors[k]] for k, c in self.summary.counts.items()],
+            "cms": {"width": width, "depth": depth,
+                    "data": _encode(self.cms.table.astype('<u4'))},
+            "hll": {"precision": self.hll.precision, "data": _encode(self.hll.registers)},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = SpaceSaving(data["capacity"])
+        summary.floor = data["floor"]
+        summary.counts = {k: c for k, c, _ in data["counts"]}
+        summary.errors = {k: e for k, _, e in data["counts"]}
+        cms = data["cms"]
+        table = _decode(cms["data"], '<u4').astype(np.uint32).reshape(cms["depth"], cms["width"])
+        hll = HyperLogLog(data["hll"]["precision"], _decode(data["hll"]["data"], np.uint8))
+        return cls(summary, CountMinSketch(table=table), hll, data["total"])
+
+
+def _encode(array):
+    return base64.b64encode(zlib.compress(array.tobytes())).decode('ascii')
+
+
+def _decode(data, dtype):
+    # frombuffer views are read-only; copy so the arrays can be merged into
+    return np.frombuffer(zlib.decompress(base64.b64decode(data)), dtype=dtype).copy()
+
+
+def sketch_json_default(value):
+    # json.dump(default=...) hook for partials that carry TypeSketch objects
+    if isinstance(value, TypeSketch):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
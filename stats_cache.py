@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from metrics import counter, histogram, timed
+
+LOAD_SECONDS = histogram("stats_file_load_seconds", "Time to load a cached stats/index file", ("file",))
+LOAD_FAILURES = counter("stats_file_load_failures_total", "Failed stats/index file loads", ("file",))
+
+
+class StatsSnapshot:
+    """One parsed version of a stats file plus everything derived from it.
+
+    Derived values (e.g. serialized response bodies) are built at most once
+    per snapshot; a reload creates a new snapshot, which drops them all.
+    """
+
+    def __init__(self, data, signature):
+        self.data = data
+        self.signature = signature
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, builder):
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = builder(self.data)
+                    self._derived[name] = value
+        return value
+
+    def json_body(self, name, builder):
+        """Returns (body bytes, etag) for builder(data), serialized once per snapshot."""
+        return self.derived(name, lambda data: make_json_body(builder(data)))
+
+
+def make_json_body(payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return body, hashlib.sha1(body).hexdigest()
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class StatsCache:
+    """Thread-safe cache of a JSON stats file, invalidated on mtime/inode/size change.
+
+    The file is stat()ed at most once per check_interval seconds, so a burst
+    of dashboard polls does not touch the disk at all. loader turns the path
+    into the cached data (JSON by default).
+    """
+
+    def __init__(self, path, check_interval=1.0, loader=_load_json):
+        self.path = path
+        self.check_interval = check_interval
+        self.loader = loader
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def snapshot(self):
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is not None and now - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and now - self._checked_at < self.check_interval:
+                return snap
+            signature = self._signature()
+            if snap is None or signature != snap.signature:
+                data = None
+                if signature is not None:
+                    print(f"Reloading {self.path}...")
+                    label = (os.path.basename(self.path),)
+                    try:
+                        with timed(LOAD_SECONDS, label):
+                            data = self.loader(self.path)
+                    except (OSError, ValueError, KeyError) as e:
+                        # Keep serving the previous version while a writer is mid-update
+                        print(f"Failed to load {self.path}: {e}")
+                        LOAD_FAILURES.inc(1, label)
+                        if snap is not None:
+                            return snap
+                        signature = None
+                snap = StatsSnapshot(data, signature)
+                self._snapshot = snap
+            self._checked_at = now
+            return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
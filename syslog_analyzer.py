@@ -1,19 +1,22 @@
 import os
-import glob
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 
 import json
 
+from event_store import EventStore, EVENT_STORE_DIR
+from scan_engine import read_error_rows, count_types, row_events, month_log_files
+from forecast_index import ForecastIndex, index_from_store
+from time_index import TimeBucketIndex
+
 SYSLOG_DIR = os.environ.get("SYSLOG_DIR", "syslog1년치")
-STATS_FILE = "stats.json"
+STATS_FILE = os.environ.get("STATS_FILE", "stats.json")
 
 class SyslogAnalyzer:
-    def __init__(self, root_dir=SYSLOG_DIR):
+    def __init__(self, root_dir=SYSLOG_DIR, event_store_dir=EVENT_STORE_DIR):
         self.root_dir = root_dir
+        self.event_store = EventStore(event_store_dir)
         self.top_5_types = []
-        self.daily_counts = {} # Used if full scan
+        self.time_index = None # Hourly per-type counts (bounded), built if full scan
         self.monthly_counts = {} # Used if loaded from json
         self.july_messages = []
         self.use_json = False
@@ -57,9 +60,13 @@ class SyslogAnalyzer:
         if self.load_stats_from_json():
             return self.top_5_types
 
+        if self.event_store.exists():
+            return self._analyze_from_store()
+
         print("Analyzing 12 months of data... this may take a moment.")
         
         type_counter = {}
+        file_events = {}
         
         # Iterate through all months 01-12
         for month in range(1, 13):
@@ -68,40 +75,25 @@ class SyslogAnalyzer:
             if not os.path.exists(month_path):
                 continue
                 
-            files = glob.glob(os.path.join(month_path, "*.txt"))
+            files = month_log_files(month_path)
             for fpath in files:
                 try:
                     # OPTIMIZATION: Read only first 2000 lines per file to reduce lag
-                    with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                        line_count = 0
-                        for line in f:
-                            if line_count > 2000: break 
-                            line_count += 1
-                            
-                            parts = line.split('\t')
-                            if len(parts) > 8:
-                                # Col 2 (index 2) is Severity, check for 'err'
-                                if 'err' in parts[2]:
-                                    error_type = parts[7]
-                                    
-                                    # Count for Top 5
-                                    type_counter[error_type] = type_counter.get(error_type, 0) + 1
-                                    
-                                    # Date for Daily Ratio (Col 5 is Date "2025-01-01 00:00:00")
-                                    # We just need the date part
-                                    try:
-                                        date_str = parts[5].split()[0]
-                                        if date_str not in self.daily_counts:
-                                            self.daily_counts[date_str] = {}
-                                        self.daily_counts[date_str][error_type] = self.daily_counts[date_str].get(error_type, 0) + 1
-                                    except:
-                                        pass
-                                    
-                                    if month == 7:
-                                        self.july_messages.append((error_type, parts[8]))
-
+                    rows = read_error_rows(fpath, max_lines=2000)
                 except Exception as e:
                     print(f"Error reading {fpath}: {e}")
+                    continue
+
+                # Count for Top 5
+                count_types(rows, type_counter)
+
+                # Timestamps (Col 5 "2025-01-01 00:00:00") for the hourly time index
+                file_events[fpath] = row_events(rows)
+
+                if month == 7:
+                    self.july_messages.extend(zip(rows["type"], rows["message"]))
+
+        self.time_index = TimeBucketIndex.from_forecast_index(ForecastIndex.build(list(file_events), file_events))
 
         # Identify Top 5
         sorted_types = sorted(type_counter.items(), key=lambda x: x[1], reverse=True)
@@ -110,6 +102,28 @@ class SyslogAnalyzer:
         print(f"Top 5 Error Types: {self.top_5_types}")
         return self.top_5_types
 
+    def _analyze_from_store(self):
+        print(f"Analyzing 12 months from event store {self.event_store.store_dir}...")
+        type_counter = {}
+
+        for month_str in self.event_store.months():
+            # Columnar bincount over the type codes; per-event type strings only for July
+            for error_type, count in self.event_store.type_counts(month_str).items():
+                if count:
+                    type_counter[error_type] = type_counter.get(error_type, 0) + count
+
+            if month_str == "07":
+                self.july_messages.extend(zip(self.event_store.types(month_str), self.event_store.messages(month_str)))
+
+        # Only the timestamp and type columns are touched here
+        self.time_index = TimeBucketIndex.from_forecast_index(index_from_store(self.event_store.store_dir))
+
+        sorted_types = sorted(type_counter.items(), key=lambda x: x[1], reverse=True)
+        self.top_5_types = [t[0] for t in sorted_types[:5]]
+
+        print(f"Top 5 Error Types: {self.top_5_types}")
+        return self.top_5_types
+
     def get_training_data(self, target_months=['07']):
         self.july_messages = [] # Reset/Reuse variable (naming legacy but logic updated)
         
@@ -117,17 +131,16 @@ class SyslogAnalyzer:
         
         for m_str in target_months:
             month_path = os.path.join(self.root_dir, m_str)
-            if os.path.exists(month_path):
+            if self.event_store.has_month(m_str):
+                # Message column only, no re-parsing of the raw text
+                self.july_messages.extend(zip(self.event_store.types(m_str), self.event_store.messages(m_str)))
+            elif os.path.exists(month_path):
                 print(f" Scanning {month_path}...")
-                files = glob.glob(os.path.join(month_path, "*.txt"))
+                files = month_log_files(month_path)
                 for fpath in files:
                     try:
-                        # Sample 2000 lines for training speed too
-                        with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                            for line in f:
-                                parts = line.split('\t')
-                                if len(parts) > 8 and 'err' in parts[2].lower():
-                                    self.july_messages.append((parts[7], parts[8]))
+                        rows = read_error_rows(fpath)
+                        self.july_messages.extend(zip(rows["type"], rows["message"]))
                     except: pass
             else:
                 print(f"Warning: Data for month {m_str} not found.")
@@ -0,0 +1,41 @@
+import time
+import socket
+import random
+import argparse
+from datetime import datetime
+
+from benchmarks.synthetic import make_line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send synthetic syslog TSV lines to the live ingest daemon.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5140)
+    parser.add_argument("--proto", choices=["udp", "tcp"], default="udp")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=500, help="lines per second (0 = as fast as possible)")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.proto == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda data: sock.sendto(data, (args.host, args.port))
+    else:
+        sock = socket.create_connection((args.host, args.port))
+        send = sock.sendall
+
+    start = time.perf_counter()
+    for seq in range(args.count):
+        send(make_line(rng, datetime.now(), seq, args.error_rate).encode('utf-8'))
+        if args.rate:
+            delay = start + (seq + 1) / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sock.close()
+    print(f"Sent {args.count} lines over {args.proto} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import re
+from collections import OrderedDict
+
+# Drain-style log template miner (He et al., "Drain: An Online Log Parsing
+# Approach with Fixed Depth Tree"). Messages are routed through a tree of
+# fixed depth (token count, then the first DEPTH - 2 tokens) to a small list
+# of candidate clusters; the most similar one absorbs the message and any
+# differing positions become the wildcard.
+
+WILDCARD = "<*>"
+DEPTH = 4
+SIM_THRESHOLD = 0.4
+MAX_CHILDREN = 100
+# Live clusters kept per miner; the least recently matched one is dropped past this
+MAX_CLUSTERS = 5000
+# Exact masked-message -> cluster shortcut, cleared when full
+MAX_CACHE = 100000
+
+# Values that are never part of a template: IPv4(:port), MAC, hex, plain numbers
+_MASK_RE = re.compile(
+    r"(?<![\w.])(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?(?![\w.])"
+    r"|\b[0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5}\b"
+    r"|\b0x[0-9a-fA-F]+\b"
+    r"|(?<![\w./-])-?\d+(?:\.\d+)?(?![\w./-])"
+)
+_DIGIT_RE = re.compile(r"\d")
+
+
+def mask_message(message):
+    return _MASK_RE.sub(WILDCARD, message)
+
+
+class LogCluster:
+    __slots__ = ("id", "tokens", "size", "leaf")
+
+    def __init__(self, cluster_id, tokens, size, leaf):
+        self.id = cluster_id
+        self.tokens = tokens
+        self.size = size
+        self.leaf = leaf
+
+    @property
+    def template(self):
+        return " ".join(self.tokens)
+
+
+class TemplateMiner:
+    """Streaming template miner with a fixed-depth prefix tree and an LRU of clusters."""
+
+    def __init__(self, depth=DEPTH, sim_threshold=SIM_THRESHOLD, max_children=MAX_CHILDREN,
+                 max_clusters=MAX_CLUSTERS):
+        self.prefix_depth = max(depth - 2, 0)
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.root = {}
+        self.clusters = OrderedDict() # id -> LogCluster, least recently matched first
+        self._cache = {}
+        self._next_id = 1
+
+    def _leaf(self, tokens):
+        node = self.root.get(len(tokens))
+        if node is None:
+            node = self.root[len(tokens)] = {}
+        for token in tokens[:self.prefix_depth]:
+            # Tokens with digits are most likely parameters; route them to the wildcard child
+            key = WILDCARD if _DIGIT_RE.search(token) else token
+            child = node.get(key)
+            if child is None:
+                if key != WILDCARD and len(node) >= self.max_children:
+                    key = WILDCARD
+                    child = node.get(key)
+                if child is None:
+                    child = node[key] = {}
+            node = child
+        leaf = node.get(None)
+        if leaf is None:
+            leaf = node[None] = []
+        return leaf
+
+    def _best_match(self, leaf, tokens):
+        best, best_sim, best_params = None, -1.0, -1
+        for cluster in leaf:
+            sim = params = 0
+            for t_tok, m_tok in zip(cluster.tokens, tokens):
+                if t_tok == WILDCARD:
+                    params += 1
+                elif t_tok == m_tok:
+                    sim += 1
+            sim = sim / len(tokens) if tokens else 1.0
+            if sim > best_sim or (sim == best_sim and params > best_params):
+                best, best_sim, best_params = cluster, sim, params
+        if best is not None and best_sim >= self.sim_threshold:
+            return best
+        return None
+
+    def add(self, message, count=1):
+        """Adds count occurrences of message; returns the LogCluster it was assigned to."""
+        content = mask_message(message)
+        cluster = self.clusters.get(self._cache.get(content))
+        if cluster is not None:
+            cluster.size += count
+            self.clusters.move_to_end(cluster.id)
+            return cluster
+
+        tokens = content.split()
+        leaf = self._leaf(tokens)
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            cluster = LogCluster(self._next_id, tokens, count, leaf)
+            self._next_id += 1
+            leaf.append(cluster)
+            self.clusters[cluster.id] = cluster
+            if self.max_clusters and len(self.clusters) > self.max_clusters:
+                _, evicted = self.clusters.popitem(last=False)
+                evicted.leaf.remove(evicted)
+        else:
+            if cluster.tokens != tokens:
+                cluster.tokens = [t if t == m else WILDCARD for t, m in zip(cluster.tokens, tokens)]
+            cluster.size += count
+            self.clusters.move_to_end(cluster.id)
+
+        if len(self._cache) >= MAX_CACHE:
+            self._cache.clear()
+        self._cache[content] = cluster.id
+        return cluster
+
+    def template_counts(self):
+        """{template: count} over the live clusters, in creation order."""
+        counts = {}
+        for cluster in sorted(self.clusters.values(), key=lambda c: c.id):
+            template = cluster.template
+            counts[template] = counts.get(template, 0) + cluster.size
+        return counts
+
+
+def mine_messages(messages):
+    """Template counts for one batch of messages (e.g. the error lines of a file)."""
+    miner = TemplateMiner()
+    for message in messages:
+        miner.add(message)
+    return miner.template_counts()
+
+
+def template_texts(messages):
+    """Replaces every message by its final template, e.g. as a low-vocabulary training corpus."""
+    miner = TemplateMiner(max_clusters=None)
+    clusters = [miner.add(message) for message in messages]
+    return [cluster.template for cluster in clusters]
+
+
+def consolidate(template_counts_list):
+    """Merges template counts mined separately (per file/month) into one template set.
+
+    Returns ({template: count}, [{template: count} per input]) where each
+    input's counts are re-keyed onto the merged templates. Inputs are
+    re-mined in order, so the result is deterministic.
+    """
+    miner = TemplateMiner(max_clusters=None)
+    assigned = []
+    for template_counts in template_counts_list:
+        per_cluster = {}
+        for template, count in template_counts.items():
+            cluster = miner.add(template, count)
+            per_cluster[cluster.id] = per_cluster.get(cluster.id, 0) + count
+        assigned.append(per_cluster)
+
+    templates = {c.id: c.template for c in miner.clusters.values()}
+    merged = {}
+    for cluster_id in sorted(templates):
+        template = templates[cluster_id]
+        merged[template] = merged.get(template, 0) + miner.clusters[cluster_id].size
+    per_input = []
+    for per_cluster in assigned:
+        counts = {}
+        for cluster_id, count in per_cluster.items():
+            counts[templates[cluster_id]] = counts.get(templates[cluster_id], 0) + count
+        per_input.append(counts)
+    return merged, per_input
@@ -0,0 +1,100 @@
+import numpy as np
+
+# Memory bound: at most MAX_TYPES individual type rows (plus "(all)" and
+# "(other)") by MAX_HOURS hourly buckets of int32 prefix sums, i.e. about
+# 514 * 9601 * 4 bytes = ~20MB worst case, whatever the archive size.
+MAX_TYPES = 512
+MAX_HOURS = 400 * 24
+ALL_TYPES = "(all)"
+OTHER_TYPE = "(other)"
+# Cap on buckets per series in one response
+MAX_BUCKETS = 10000
+BUCKET_UNITS = {"hour": "h", "day": "D", "month": "M"}
+
+
+class TimeBucketIndex:
+    """Per-type hourly error counts stored as prefix sums.
+
+    prefix[row, h] is the number of events of that row before hour
+    start_hour + h, so any range sum is prefix[row, h1] - prefix[row, h0]
+    and day/month roll-ups are the same subtraction at coarser edges.
+    Row 0 counts all types, rows 1..K the K most frequent types, and the
+    last row (if needed) everything beyond them. Hours are the log's
+    wall-clock time (ts // 3600); events older than MAX_HOURS before the
+    newest one are left out.
+    """
+
+    def __init__(self, types, codes, ts, max_types=MAX_TYPES, max_hours=MAX_HOURS):
+        codes = np.asarray(codes, dtype=np.int64)
+        hours = np.asarray(ts, dtype=np.int64) // 3600
+        self.end_hour = int(hours.max()) + 1 if len(hours) else 0
+        self.start_hour = max(int(hours.min()), self.end_hour - max_hours) if len(hours) else 0
+        keep = hours >= self.start_hour
+        self.dropped = int(len(hours) - keep.sum())
+        codes, hours = codes[keep], hours[keep] - self.start_hour
+
+        # Most frequent types get their own row; the rest share "(other)"
+        counts = np.bincount(codes, minlength=len(types))
+        order = sorted(range(len(types)), key=lambda k: (-counts[k], types[k]))
+        row_of = np.full(len(types), 0, dtype=np.int64)
+        self.row_names = [ALL_TYPES]
+        for k in order[:max_types]:
+            row_of[k] = len(self.row_names)
+            self.row_names.append(types[k])
+        if len(types) > max_types:
+            row_of[order[max_types:]] = len(self.row_names)
+            self.row_names.append(OTHER_TYPE)
+        self.rows = {name: r for r, name in enumerate(self.row_names)}
+        # Real types without a row of their own; their events are in "(other)"
+        self.folded = frozenset(types[k] for k in order[max_types:])
+
+        n_rows, n_hours = len(self.row_names), self.end_hour - self.start_hour
+        hourly = np.bincount(row_of[codes] * n_hours + hours, minlength=n_rows * n_hours).reshape(n_rows, n_hours)
+        hourly[0] = hourly[1:].sum(axis=0)
+        dtype = np.int32 if len(codes) < 2 ** 31 else np.int64
+        self.prefix = np.zeros((n_rows, n_hours + 1), dtype=dtype)
+        np.cumsum(hourly, axis=1, dtype=dtype, out=self.prefix[:, 1:])
+
+    @classmethod
+    def from_forecast_index(cls, index, **kwargs):
+        codes = np.repeat(np.arange(len(index.types)), np.diff(index.offsets))
+        return cls(index.types, codes, index.ts, **kwargs)
+
+    def hour_range(self):
+        return self.start_hour, self.end_hour
+
+    def _col(self, hour):
+        return min(max(hour - self.start_hour, 0), self.prefix.shape[1] - 1)
+
+    def totals(self, rows, h0, h1):
+        """Event counts per row in hours [h0, h1)."""
+        return self.prefix[rows, self._col(h1)] - self.prefix[rows, self._col(h0)]
+
+    def top(self, h0, h1, n):
+        """The n type rows with the most events in [h0, h1), as [(name, count)]."""
+        counts = self.totals(slice(1, None), h0, h1)
+        best = np.argsort(-counts, kind='stable')[:n]
+        return [(self.row_names[r + 1], int(counts[r])) for r in best if counts[r] > 0]
+
+    def series(self, rows, edges):
+        """Counts per row between consecutive hour edges: int array [len(rows), len(edges) - 1]."""
+        cols = np.clip(np.asarray(edges, dtype=np.int64) - self.start_hour, 0, self.prefix.shape[1] - 1)
+        sums = self.prefix[np.asarray(rows)[:, None], cols[None, :]]
+        return np.diff(sums, axis=1)
+
+
+def bucket_edges(h0, h1, bucket):
+    """Hour edges and labels for buckets covering [h0, h1); bucket is hour, day, month or none."""
+    if bucket == "none":
+        edges = np.array([h0, h1], dtype=np.int64)
+        return edges, [str(np.datetime64(h0, 'h'))]
+    unit = BUCKET_UNITS[bucket]
+    first = np.datetime64(h0, 'h').astype(f'datetime64[{unit}]')
+    last = np.datetime64(h1 - 1, 'h').astype(f'datetime64[{unit}]')
+    # Checked before np.arange, which would otherwise allocate the whole requested range
+    if int((last - first).astype(np.int64)) + 1 > MAX_BUCKETS:
+        raise ValueError(f"more than {MAX_BUCKETS} {bucket} buckets requested")
+    starts = np.arange(first, last + 1)
+    edges = np.append(starts.astype('datetime64[h]').astype(np.int64), h1)
+    edges[0] = h0 # A range starting mid-day/month gets a partial first bucket
+    return edges, [str(s) for s in starts]
@@ -0,0 +1,136 @@
+import json
+import time
+import threading
+from collections import deque
+
+MAX_EVENTS = 2000
+# Per-batch loss/throughput events are throttled to at most one per interval
+BATCH_EVENT_INTERVAL = 0.25
+# Clients turned away from the SSE feed poll /api/train/status?since= this often
+POLL_INTERVAL_MS = 1000
+
+
+class TrainingEventLog:
+    """Bounded, lock-protected log of training events with sequence numbers.
+
+    Every event gets a monotonically increasing "seq", so a client that
+    reconnects with the last seq it saw only receives what it missed.
+    Only the most recent MAX_EVENTS are kept; current status and progress
+    are tracked separately so they survive eviction.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self.seq = 0
+        self.status = 'idle' # idle, queued, running, completed, error, cancelled
+        self.progress = 0
+        self._last_batch_event = 0.0
+
+    def _append(self, kind, data):
+        # Caller holds self._cond
+        self.seq += 1
+        event = {'seq': self.seq, 'type': kind, **data}
+        self._events.append(event)
+        self._cond.notify_all()
+        return event
+
+    def log(self, message):
+        print(message)
+        with self._cond:
+            return self._append('log', {'message': message})
+
+    def set_progress(self, progress):
+        with self._cond:
+            if progress != self.progress:
+                self.progress = progress
+                self._append('progress', {'progress': progress})
+
+    def set_status(self, status, message=None):
+        with self._cond:
+            self.status = status
+            if status == 'running':
+                self.progress = 0
+            data = {'status': status, 'progress': self.progress}
+            if message:
+                data['message'] = message
+            self._append('status', data)
+
+    def batch(self, epoch, batch, n_batches, loss, seq_per_sec, force=False):
+        now = time.monotonic()
+        with self._cond:
+            if not force and now - self._last_batch_event < BATCH_EVENT_INTERVAL:
+                return
+            self._last_batch_event = now
+            self._append('batch', {'epoch': epoch + 1, 'batch': batch + 1, 'batches': n_batches,
+                                   'loss': round(loss, 4), 'seq_per_sec': round(seq_per_sec, 1)})
+
+    def since(self, seq):
+        """Events after seq; (events, complete) where complete is False if some were evicted."""
+        with self._cond:
+            events = [e for e in self._events if e['seq'] > seq]
+            complete = not self._events or self._events[0]['seq'] <= seq + 1
+            return events, complete
+
+    def wait(self, seq, timeout):
+        """Blocks until there are events after seq or timeout expires."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > seq, timeout=timeout)
+        return self.since(seq)
+
+    def snapshot(self, max_logs=200):
+        with self._cond:
+            logs = [e['message'] for e in self._events if e['type'] == 'log'][-max_logs:]
+            return {'status': self.status, 'progress': self.progress, 'logs': logs, 'seq': self.seq}
+
+    def poll(self, seq):
+        """Polling counterpart of sse_stream: the events after seq, or a snapshot if some were evicted."""
+        events, complete = self.since(seq)
+        if not complete or seq == 0:
+            return {'snapshot': self.snapshot(), 'events': []}
+        return {'status': self.status, 'seq': events[-1]['seq'] if events else seq, 'events': events}
+
+
+def sse_event(event):
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def sse_poll_redirect(last_seq, interval_ms=POLL_INTERVAL_MS):
+    """One-shot SSE reply for a client over the stream limit: poll /api/train/status?since= instead."""
+    yield sse_event({'seq': last_seq, 'type': 'poll', 'since': last_seq, 'interval_ms': interval_ms})
+
+
+def sse_stream(event_log, last_seq=0, max_seconds=30, keepalive=10):
+    """Yields Server-Sent Events from last_seq on.
+
+    The stream ends when training is no longer active or after max_seconds,
+    freeing the server thread; EventSource reconnects with Last-Event-ID
+    and resumes where it left off.
+    """
+    yield "retry: 1000\n\n"
+    events, complete = event_log.since(last_seq)
+    if not complete or last_seq == 0:
+        # Fresh or too-far-behind client: start from the current state
+        snap = event_log.snapshot()
+        yield sse_event({'type': 'snapshot', **snap})
+        last_seq = snap['seq']
+        events = []
+
+    deadline = time.monotonic() + max_seconds
+    while True:
+        for event in events:
+            yield sse_event(event)
+            last_seq = event['seq']
+        if event_log.status not in ('running', 'queued'):
+            # Flush whatever was appended together with the final status change
+            for event in event_log.since(last_seq)[0]:
+                yield sse_event(event)
+                last_seq = event['seq']
+            yield sse_event({'seq': last_seq, 'type': 'done', 'status': event_log.status})
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, _ = event_log.wait(last_seq, timeout=min(keepalive, remaining))
+        if not events:
+            yield ": keepalive\n\n"
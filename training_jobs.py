@@ -0,0 +1,245 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing as mp
+
+from metrics import counter, gauge, histogram
+
+# Recorded in the web process from worker messages; the worker's own registry is never exported
+EPOCH_SECONDS = histogram("training_epoch_seconds", "Wall time of one training epoch",
+                          buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600))
+EPOCH_LOSS = gauge("training_epoch_loss", "Mean loss of the last completed epoch")
+BATCH_LOSS = gauge("training_batch_loss", "Loss of the last training batch")
+BATCH_RATE = gauge("training_sequences_per_second", "Throughput of the last training batch")
+JOBS_FINISHED = counter("training_jobs_total", "Finished training jobs", ("status",))
+
+# Hard limit for one training run; the worker is cancelled (then killed) past it
+TRAIN_TIMEOUT = float(os.environ.get("TRAIN_TIMEOUT", 2 * 60 * 60))
+# Requests accepted while a run is active; anything beyond is rejected
+MAX_QUEUED = 1
+# How long a cancelled worker gets to stop at a batch boundary before it is terminated
+CANCEL_GRACE = 10.0
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+def _run_job(params, events, cancel_event):
+    """Training worker process: loads data, trains, checkpoints, reports over `events`.
+
+    Messages are tuples: ('log', msg), ('progress', pct), ('batch', epoch,
+    batch, n_batches, loss, seq_per_sec), ('epoch', epoch, total_epochs, loss,
+    seconds) and finally ('done', status, message).
+    """
+    # Imported here so the web process does not pay for them twice under 'spawn'
+    from syslog_analyzer import SyslogAnalyzer
+    from lstm_model import LogLSTMModel
+    from template_miner import template_texts
+
+    def check_cancel():
+        if cancel_event.is_set():
+            raise TrainingCancelled()
+
+    try:
+        events.put(('log', "Initializing..."))
+        months = params['months']
+        events.put(('log', f"Loading Data (Months: {months[0]} - {months[-1]})..."))
+        analyzer = SyslogAnalyzer(params['root_dir'], params['event_store_dir'])
+        training_texts = analyzer.get_training_data(target_months=months)
+        check_cancel()
+        if not training_texts:
+            events.put(('done', 'error', f"Error: No training data found for months {months[0]}-{months[-1]}."))
+            return
+        events.put(('log', f"Data Loaded. {len(training_texts)} samples from {months[0]}-{months[-1]} range."))
+        if params.get('templates'):
+            # Train on mined message templates: variable fields collapse into one wildcard token
+            training_texts = template_texts(training_texts)
+            events.put(('log', f"Using message templates ({len(set(training_texts))} distinct)."))
+
+        epochs = params['epochs']
+        model_file = params['model_file']
+        model = LogLSTMModel()
+        if os.path.exists(model_file):
+            try:
+                model.load(model_file)
+            except Exception as e:
+                events.put(('log', f"Ignoring unreadable checkpoint: {e}"))
+        # Set by train(): it only resumes the checkpoint if the vocabulary is unchanged
+        run = {'start_epoch': 0}
+
+        def on_start(start_epoch, total_epochs):
+            run['start_epoch'] = start_epoch
+            events.put(('log', f"Training epochs {start_epoch + 1}-{total_epochs}..."))
+
+        def on_batch(epoch, batch, n_batches, loss, seq_per_sec):
+            check_cancel()
+            events.put(('batch', epoch, batch, n_batches, loss, seq_per_sec))
+            start_epoch = run['start_epoch']
+            done = (epoch - start_epoch) + (batch + 1) / n_batches
+            events.put(('progress', min(max(int(done / max(epochs - start_epoch, 1) * 100), 0), 100)))
+
+        def on_epoch(epoch, total_epochs, loss, seconds):
+            events.put(('epoch', epoch, total_epochs, loss, seconds))
+
+        loss = model.train(training_texts, epochs=epochs, on_batch=on_batch, on_epoch=on_epoch,
+                           checkpoint_path=model_file, resume=True, on_start=on_start)
+        if loss is None and model.epochs_completed < epochs:
+            events.put(('done', 'error', "Error: Not enough data to train (too few tokens)."))
+            return
+        events.put(('progress', 100))
+        events.put(('done', 'completed', "Training Finished Successfully."))
+    except TrainingCancelled:
+        # Epochs finished before the cancel are already checkpointed and resume next time
+        events.put(('done', 'cancelled', "Training cancelled."))
+    except Exception as e:
+        events.put(('done', 'error', f"Training failed: {e}"))
+
+
+class TrainingJobManager:
+    """Runs LSTM training jobs one at a time in a separate process.
+
+    Submissions are accepted or rejected under one lock, so two concurrent
+    /api/train calls can never start two runs. Worker messages are pumped
+    into a TrainingEventLog by a small thread in the web process; the only
+    work that thread does is forwarding, so request latency is unaffected
+    while the NumPy training runs in the other process.
+    """
+
+    def __init__(self, event_log, on_complete=None, before_start=None,
+                 timeout=TRAIN_TIMEOUT, max_queued=MAX_QUEUED):
+        self.event_log = event_log
+        self.on_complete = on_complete
+        self.before_start = before_start
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self._ctx = mp.get_context('spawn')
+        self._lock = threading.Lock()
+        self._active = None # dict(id, params, process, cancel_event, ...)
+        self._queued = []
+        self._next_id = 1
+
+    def submit(self, params):
+        """Returns ('started' | 'queued' | 'rejected', job id or None)."""
+        with self._lock:
+            if self._active is None:
+                job_id = self._new_id()
+                self._start(job_id, params)
+                return 'started', job_id
+            if len(self._queued) < self.max_queued:
+                job_id = self._new_id()
+                self._queued.append((job_id, params))
+                self.event_log.log(f"Training request #{job_id} queued (position {len(self._queued)}).")
+                return 'queued', job_id
+            return 'rejected', None
+
+    def cancel(self):
+        """Drops queued requests and stops the running job; returns the number of jobs cancelled."""
+        with self._lock:
+            cancelled = len(self._queued)
+            self._queued = []
+            if self._active is not None and not self._active['cancel_event'].is_set():
+                self._active['cancel_event'].set()
+                self._active['cancelled_at'] = time.monotonic()
+                self.event_log.log("Cancelling training...")
+                cancelled += 1
+            return cancelled
+
+    def is_busy(self):
+        with self._lock:
+            return self._active is not None
+
+    def _new_id(self):
+        job_id = self._next_id
+        self._next_id += 1
+        return job_id
+
+    def _start(self, job_id, params):
+        # Caller holds self._lock
+        if self.before_start is not None:
+            self.before_start()
+        events = self._ctx.Queue()
+        cancel_event = self._ctx.Event()
+        process = self._ctx.Process(target=_run_job, args=(params, events, cancel_event),
+                                    name=f"train-job-{job_id}", daemon=True)
+        process.start()
+        self.event_log.set_status('running')
+        job = {'id': job_id, 'params': params, 'process': process, 'events': events,
+               'cancel_event': cancel_event, 'started_at': time.monotonic(), 'cancelled_at': None,
+               'timed_out': False}
+        self._active = job
+        threading.Thread(target=self._pump, args=(job,), name=f"train-pump-{job_id}", daemon=True).start()
+
+    def _handle(self, msg):
+        kind = msg[0]
+        if kind == 'log':
+            self.event_log.log(msg[1])
+        elif kind == 'progress':
+            self.event_log.set_progress(msg[1])
+        elif kind == 'batch':
+            _, epoch, batch, n_batches, loss, seq_per_sec = msg
+            self.event_log.batch(epoch, batch, n_batches, loss, seq_per_sec, force=batch + 1 == n_batches)
+            BATCH_LOSS.set(loss)
+            BATCH_RATE.set(seq_per_sec)
+        elif kind == 'epoch':
+            _, epoch, total_epochs, loss, seconds = msg
+            self.event_log.log(f"Epoch {epoch+1}/{total_epochs} completed. (loss {loss:.4f})")
+            EPOCH_SECONDS.observe(seconds)
+            EPOCH_LOSS.set(loss)
+
+    def _pump(self, job):
+        process = job['process']
+        result = None
+        while result is None:
+            try:
+                msg = job['events'].get(timeout=0.5)
+            except queue.Empty:
+                msg = None
+            if msg is not None:
+                if msg[0] == 'done':
+                    result = msg[1:]
+                    break
+                self._handle(msg)
+
+            now = time.monotonic()
+            if msg is None and not process.is_alive():
+                # Only once the queue is drained, so a final 'done' is never missed
+                result = ('error', f"Training process exited unexpectedly (code {process.exitcode}).")
+            elif not job['cancel_event'].is_set() and now - job['started_at'] > self.timeout:
+                job['timed_out'] = True
+                job['cancel_event'].set()
+                job['cancelled_at'] = now
+                self.event_log.log(f"Training exceeded {self.timeout:.0f}s, cancelling...")
+            elif job['cancelled_at'] is not None and now - job['cancelled_at'] > CANCEL_GRACE:
+                # Still loading data or stuck outside the batch loop
+                process.terminate()
+                result = ('cancelled', "Training process terminated.")
+
+        process.join(timeout=CANCEL_GRACE)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        status, message = result
+        if job['timed_out']:
+            status, message = 'error', f"Training timed out after {self.timeout:.0f}s."
+
+        if status == 'completed' and self.on_complete is not None:
+            try:
+                self.on_complete(job['params'])
+            except Exception as e:
+                status, message = 'error', f"Failed to load trained model: {e}"
+
+        self.event_log.log(message)
+        JOBS_FINISHED.inc(1, (status,))
+        with self._lock:
+            self._active = None
+            if self._queued:
+                job_id, params = self._queued.pop(0)
+                try:
+                    self._start(job_id, params)
+                    return
+                except Exception as e:
+                    status = 'error'
+                    self.event_log.log(f"Failed to start queued training #{job_id}: {e}")
+            self.event_log.set_status(status)